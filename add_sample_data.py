@@ -1,5 +1,6 @@
 from app import create_app, db
 from app.models import ScreenTimeLog, User, ScreenTime
+from app.wellbeing.ingest import refresh_derived
 import random
 from datetime import datetime, timedelta
 
@@ -14,6 +15,7 @@ with app.app_context():
         print(f"Adding sample data for user: {user.username}")
         
         # Add screen time logs for the past 14 days
+        logs = []
         for i in range(14):
             date = (datetime.utcnow() - timedelta(days=i)).date()
             
@@ -22,16 +24,18 @@ with app.app_context():
                 # Random usage between 10 and 120 minutes
                 minutes = random.randint(10, 120)
                 
-                # Create and add the log
-                log = ScreenTimeLog(
-                    user_id=user.id,
-                    date=date,
-                    app_name=app_name,
-                    usage_minutes=minutes
-                )
-                db.session.add(log)
+                logs.append({
+                    'user_id': user.id,
+                    'date': date,
+                    'app_name': app_name,
+                    'usage_minutes': minutes
+                })
         
-        # Commit all the logs
+        # Re-running the script replaces the sample days instead of duplicating them
+        ScreenTimeLog.upsert(logs)
+        
+        # Commit all the logs along with the rollup, app-limit statuses, detox progress and insights version
+        refresh_derived(user.id, {log['date'] for log in logs})
         db.session.commit()
         
         # Generate the aggregated screen time data
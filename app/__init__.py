@@ -5,6 +5,7 @@ from flask_migrate import Migrate
 from flask_executor import Executor
 import os
 from dotenv import load_dotenv
+from app.cache import LRUCache
 
 # Load environment variables
 load_dotenv()
@@ -14,6 +15,8 @@ db = SQLAlchemy()
 login_manager = LoginManager()
 migrate = Migrate()
 executor = Executor()
+usage_cache = LRUCache('USAGE_CACHE')
+insights_cache = LRUCache('INSIGHTS_CACHE')
 
 def create_app():
     app = Flask(__name__)
@@ -26,6 +29,28 @@ def create_app():
     app.config['PROFILE_PICS'] = os.path.join(app.config['UPLOAD_FOLDER'], 'profile_pics')
     app.config['EXCEL_FILES'] = os.path.join(app.config['UPLOAD_FOLDER'], 'excel_files')
     
+    # Background screen time imports run on the executor's thread pool
+    app.config['EXECUTOR_TYPE'] = 'thread'
+    app.config['EXECUTOR_MAX_WORKERS'] = int(os.environ.get('EXECUTOR_MAX_WORKERS', 2))
+    
+    # How re-imported screen time rows merge with stored ones: 'replace' or 'sum'
+    app.config['SCREEN_TIME_UPSERT_MODE'] = os.environ.get('SCREEN_TIME_UPSERT_MODE', 'replace')
+    app.config['SCREEN_TIME_API_MAX_RECORDS'] = int(os.environ.get('SCREEN_TIME_API_MAX_RECORDS', 10000))
+    
+    # Per-user screen time aggregates are cached in-process (entries, seconds)
+    app.config['USAGE_CACHE_SIZE'] = int(os.environ.get('USAGE_CACHE_SIZE', 1024))
+    app.config['USAGE_CACHE_TTL'] = int(os.environ.get('USAGE_CACHE_TTL', 300))
+    
+    # Computed insight bundles are cached per user and data version (entries, seconds, bytes)
+    app.config['INSIGHTS_CACHE_SIZE'] = int(os.environ.get('INSIGHTS_CACHE_SIZE', 512))
+    app.config['INSIGHTS_CACHE_TTL'] = int(os.environ.get('INSIGHTS_CACHE_TTL', 3600))
+    app.config['INSIGHTS_CACHE_MAX_BYTES'] = int(os.environ.get('INSIGHTS_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+    
+    # Trained habit dropout model, written by `flask habits train-dropout`
+    app.config['DROPOUT_MODEL_PATH'] = os.environ.get(
+        'DROPOUT_MODEL_PATH', os.path.join(app.instance_path, 'dropout_model.json')
+    )
+    
     # Ensure upload directories exist
     os.makedirs(app.config['PROFILE_PICS'], exist_ok=True)
     os.makedirs(app.config['EXCEL_FILES'], exist_ok=True)
@@ -43,6 +68,8 @@ def create_app():
     login_manager.login_message_category = 'info'
     migrate.init_app(app, db)
     executor.init_app(app)
+    usage_cache.init_app(app)
+    insights_cache.init_app(app)
     
     # Import and register blueprints
     from app.auth.routes import auth
@@ -63,6 +90,10 @@ def create_app():
     app.register_blueprint(gamification)
     app.register_blueprint(chatbot)
     
+    # Register maintenance CLI commands
+    from app.commands import register_commands
+    register_commands(app)
+    
     # Import models for migrations
     from app.models import User, Habit, HabitLog, ScreenTimeLog, Achievement, UserAchievement
     
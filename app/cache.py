@@ -0,0 +1,101 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe in-process cache with least-recently-used and TTL eviction.
+
+    Configured like the other extensions: create it at import time and call
+    init_app, which reads <PREFIX>_SIZE (maximum entries), <PREFIX>_TTL
+    (seconds an entry stays fresh) and optionally <PREFIX>_MAX_BYTES (memory
+    cap, measured as the pickled size of each value) from the app config.
+    Each worker process has its own copy, so the TTL bounds how stale another
+    process can be.
+    """
+
+    def __init__(self, prefix, maxsize=1024, ttl=300, max_bytes=None):
+        self.prefix = prefix
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.maxsize = app.config.get(f'{self.prefix}_SIZE', self.maxsize)
+        self.ttl = app.config.get(f'{self.prefix}_TTL', self.ttl)
+        self.max_bytes = app.config.get(f'{self.prefix}_MAX_BYTES', self.max_bytes)
+        self.clear()
+
+    def _pop(self, key):
+        self._bytes -= self._entries.pop(key)[2]
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._pop(key)
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        size = len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL)) if self.max_bytes else 0
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            if self.max_bytes and size > self.max_bytes:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value, size)
+            self._bytes += size
+            while len(self._entries) > self.maxsize or (self.max_bytes and self._bytes > self.max_bytes):
+                self._pop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, computing and storing it on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def discard(self, predicate):
+        """Drop every entry whose key matches predicate; returns how many"""
+        with self._lock:
+            stale = [key for key in self._entries if predicate(key)]
+            for key in stale:
+                self._pop(key)
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Entry count, memory use and hit/miss/eviction counters since startup"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.maxsize,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions
+            }
+
+    def __len__(self):
+        return len(self._entries)
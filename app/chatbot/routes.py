@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, request, jsonify
 from flask_login import login_required, current_user
-from app.models import Habit, HabitLog, ScreenTimeLog, ScreenTime, UserAchievement, Achievement
+from app.models import Habit, HabitLog, ScreenTime, UserAchievement, Achievement, UserDailyStats
+from app.wellbeing.usage import usage_summary
 from datetime import datetime, timedelta
 import random
 
@@ -94,17 +95,13 @@ def get_weekly_summary():
     if not habits:
         return "You haven't created any habits yet. Start by adding some habits to track!"
     
-    # Get logs from the past week
+    # Get daily totals from the past week
     today = datetime.utcnow().date()
     week_ago = today - timedelta(days=7)
-    logs = HabitLog.query.filter_by(
-        user_id=current_user.id
-    ).filter(
-        HabitLog.date >= week_ago
-    ).all()
+    week_stats = UserDailyStats.window(current_user.id, week_ago)
     
-    completed_count = sum(1 for log in logs if log.completed)
-    total_count = len(logs)
+    completed_count = sum(day.habits_completed for day in week_stats)
+    total_count = sum(day.habits_logged for day in week_stats)
     
     if total_count == 0:
         return "You haven't logged any habits this week. Start tracking to see your progress!"
@@ -147,10 +144,8 @@ def get_habit_focus():
     # Find habits with low completion rates
     habit_stats = []
     for habit in habits:
-        logs = HabitLog.query.filter_by(habit_id=habit.id).all()
-        if logs:
-            completion_rate = sum(1 for log in logs if log.completed) / len(logs)
-            habit_stats.append((habit, completion_rate))
+        if habit.total_logs:
+            habit_stats.append((habit, habit.completion_rate() / 100))
     
     if not habit_stats:
         return f"I suggest focusing on '{random.choice(habits).name}' today. You haven't logged it yet."
@@ -189,32 +184,18 @@ def get_habit_tracking_summary():
     today = datetime.utcnow().date()
     week_ago = today - timedelta(days=7)
     
-    logs = HabitLog.query.filter_by(
-        user_id=current_user.id
-    ).filter(
-        HabitLog.date >= week_ago
-    ).all()
+    # The daily rollup already holds one row per day with habit totals
+    tracked_days = [day for day in UserDailyStats.window(current_user.id, week_ago) if day.habits_logged]
     
-    if not logs:
+    if not tracked_days:
         return "You haven't tracked any habits in the last 7 days."
     
-    # Group by date
-    logs_by_date = {}
-    for log in logs:
-        date_str = log.date.strftime('%Y-%m-%d')
-        if date_str not in logs_by_date:
-            logs_by_date[date_str] = []
-        logs_by_date[date_str].append(log)
-    
     # Generate summary
-    summary = f"Here's your habit tracking for the last {len(logs_by_date)} days:\n"
+    summary = f"Here's your habit tracking for the last {len(tracked_days)} days:\n"
     
-    for date_str, day_logs in sorted(logs_by_date.items()):
-        completed = sum(1 for log in day_logs if log.completed)
-        total = len(day_logs)
-        date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
-        day_name = date_obj.strftime('%A')
-        summary += f"- {day_name}: Completed {completed}/{total} habits\n"
+    for day in tracked_days:
+        day_name = day.date.strftime('%A')
+        summary += f"- {day_name}: Completed {day.habits_completed}/{day.habits_logged} habits\n"
     
     return summary
 
@@ -223,29 +204,18 @@ def get_screen_time_summary():
     today = datetime.utcnow().date()
     week_ago = today - timedelta(days=7)
     
-    logs = ScreenTimeLog.query.filter_by(
-        user_id=current_user.id
-    ).filter(
-        ScreenTimeLog.date >= week_ago
-    ).all()
+    usage = usage_summary(current_user.id, since=week_ago)
     
-    if not logs:
+    if not usage.days:
         return "You haven't uploaded any screen time data recently."
     
     # Calculate total screen time
-    total_minutes = sum(log.usage_minutes for log in logs)
+    total_minutes = usage.total_minutes
     hours = total_minutes // 60
     minutes = total_minutes % 60
     
     # Get top apps
-    app_usage = {}
-    for log in logs:
-        if log.app_name in app_usage:
-            app_usage[log.app_name] += log.usage_minutes
-        else:
-            app_usage[log.app_name] = log.usage_minutes
-    
-    top_apps = sorted(app_usage.items(), key=lambda x: x[1], reverse=True)[:3]
+    top_apps = usage.app_totals[:3]
     
     response = f"In the last week, you spent {hours} hours and {minutes} minutes on your devices."
     
@@ -342,9 +312,8 @@ def chatbot_page():
     longest_streak = 0
     
     for habit in habits:
-        habit_logs = HabitLog.query.filter_by(habit_id=habit.id).all()
-        total_logs += len(habit_logs)
-        completed_logs += sum(1 for log in habit_logs if log.completed)
+        total_logs += habit.total_logs
+        completed_logs += habit.completed_logs
         
         # Update longest streak if this habit has a longer one
         current_streak = habit.current_streak()
@@ -0,0 +1,168 @@
+import click
+from flask.cli import AppGroup
+from app import db
+
+habits_cli = AppGroup('habits', help='Habit maintenance commands.')
+stats_cli = AppGroup('stats', help='Daily rollup maintenance commands.')
+screen_time_cli = AppGroup('screen-time', help='Screen time maintenance commands.')
+users_cli = AppGroup('users', help='User account commands.')
+
+
+@habits_cli.command('rebuild-stats')
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user\'s habits.')
+def rebuild_stats(user_id):
+    """Re-derive stored streak and completion counters from HabitLog history."""
+    from app.habits.streaks import rebuild_habit_stats
+
+    updated = rebuild_habit_stats(user_id=user_id)
+    db.session.commit()
+    click.echo(f"Rebuilt stats for {updated} habits.")
+
+
+@habits_cli.command('train-dropout')
+@click.option('--days', type=int, default=180, help='Days of as-of dates to build training rows from.')
+@click.option('--step', type=int, default=7, help='Days between as-of dates.')
+@click.option('--l2', type=float, default=1.0, help='L2 regularisation strength.')
+def train_dropout_model(days, step, l2):
+    """Train the habit dropout model on every user's history and save it."""
+    import os
+    from flask import current_app
+    from app.habits.dropout import train, save_model
+
+    try:
+        model = train(days=days, step=step, l2=l2)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    path = current_app.config['DROPOUT_MODEL_PATH']
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    save_model(model, path)
+    click.echo(f"Saved dropout model to {path}.")
+    for name, value in model.metrics.items():
+        click.echo(f"  holdout {name}: {value:.4f}" if isinstance(value, float) else f"  holdout {name}: {value}")
+
+
+@habits_cli.command('score-dropout')
+def score_dropout():
+    """Score every habit's dropout risk with the saved model (suitable for a nightly cron job)."""
+    from flask import current_app
+    from app.habits.dropout import load_model, score_habits
+
+    path = current_app.config['DROPOUT_MODEL_PATH']
+    try:
+        model = load_model(path)
+    except FileNotFoundError:
+        raise click.ClickException(f"No dropout model at {path}; run `flask habits train-dropout` first.")
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    scored = score_habits(model)
+    db.session.commit()
+    click.echo(f"Scored dropout risk for {scored} habits.")
+
+
+@stats_cli.command('backfill')
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user\'s rollup.')
+def backfill_daily_stats(user_id):
+    """Rebuild the per-user daily rollup and the detox plan progress and screen time trends derived from it."""
+    from app.models import User, UserDailyStats, DigitalDetoxPlan, ScreenTimeTrend
+
+    written = UserDailyStats.backfill(user_id=user_id)
+    ScreenTimeTrend.rebuild(user_id=user_id)
+    plans = DigitalDetoxPlan.query
+    if user_id is not None:
+        plans = plans.filter_by(user_id=user_id)
+    plans = plans.all()
+    for plan in plans:
+        plan.rebuild_progress()
+    user_ids = [user_id] if user_id is not None else [row.id for row in db.session.query(User.id)]
+    User.bump_data_version(*user_ids)
+    db.session.commit()
+    click.echo(f"Wrote {written} daily stats rows and rebuilt progress for {len(plans)} detox plans.")
+
+
+@stats_cli.command('snapshot-scores')
+@click.option('--date', 'day', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Last day to score (defaults to today).')
+@click.option('--days', type=int, default=1, help='Number of days up to --date to score.')
+def snapshot_wellbeing_scores(day, days):
+    """Write every user's daily wellbeing score from the rollup (suitable for a nightly cron job)."""
+    from datetime import datetime, timedelta
+    from app.models import WellbeingScore
+
+    last = day.date() if day else datetime.utcnow().date()
+    written = WellbeingScore.snapshot([last - timedelta(days=i) for i in range(days)])
+    db.session.commit()
+    click.echo(f"Wrote {written} wellbeing scores.")
+
+
+@screen_time_cli.command('refresh')
+def refresh_screen_time():
+    """Refresh today's aggregated ScreenTime row for every user."""
+    from app.models import ScreenTime
+
+    refreshed = ScreenTime.generate_for_users()
+    click.echo(f"Refreshed screen time summaries for {refreshed} users.")
+
+
+@screen_time_cli.command('check-limits')
+@click.option('--date', 'day', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help='Last day to evaluate (defaults to today).')
+@click.option('--days', type=int, default=1, help='Number of days up to --date to evaluate.')
+def check_app_limits(day, days):
+    """Evaluate every user's active app limits against their screen time."""
+    from datetime import datetime, timedelta
+    from app.models import AppLimitStatus
+
+    last = day.date() if day else datetime.utcnow().date()
+    written = AppLimitStatus.evaluate([last - timedelta(days=i) for i in range(days)])
+    db.session.commit()
+    violations = AppLimitStatus.query.filter(
+        AppLimitStatus.date > last - timedelta(days=days),
+        AppLimitStatus.date <= last,
+        AppLimitStatus.headroom_minutes < 0
+    ).count()
+    click.echo(f"Wrote {written} app limit statuses ({violations} over the limit).")
+
+
+@screen_time_cli.command('import-dir')
+@click.argument('directory', type=click.Path(exists=True, file_okay=False))
+@click.option('--key', type=click.Choice(['username', 'email', 'id']), default='username',
+              help='User column that file and directory names are matched on.')
+@click.option('--workers', type=int, default=None, help='Parser processes (defaults to the CPU count).')
+@click.option('--chunk-size', type=int, default=5000, help='Rows read from a file at a time.')
+@click.option('--batch-size', type=int, default=5000, help='Rows per bulk insert.')
+@click.option('--force', is_flag=True, help='Re-import files that were already imported.')
+def import_screen_time_dir(directory, key, workers, chunk_size, batch_size, force):
+    """Backfill historical exports named after their users (alice.csv or alice/*.xlsx)."""
+    from app.wellbeing.backfill import backfill_directory
+
+    def report(result):
+        click.echo(f"{result.path}: {result.status}, {result.rows} rows, {result.rejected} skipped "
+                   f"(parse {result.parse_seconds:.2f}s, write {result.write_seconds:.2f}s)")
+
+    stats = backfill_directory(directory, key=key, workers=workers, chunk_size=chunk_size,
+                               batch_size=batch_size, force=force, report=report)
+    rate = stats.rows / stats.seconds if stats.seconds else 0
+    click.echo(f"Imported {stats.rows} rows from {stats.files} files for {stats.users} users "
+               f"in {stats.seconds:.2f}s ({rate:.0f} rows/s).")
+
+
+@users_cli.command('issue-token')
+@click.argument('username')
+def issue_api_token(username):
+    """Issue a device API token for a user, revoking the previous one."""
+    from app.models import User
+
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.ClickException(f"No user named {username}.")
+
+    token = user.generate_api_token()
+    db.session.commit()
+    click.echo(token)
+
+
+def register_commands(app):
+    app.cli.add_command(habits_cli)
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(screen_time_cli)
+    app.cli.add_command(users_cli)
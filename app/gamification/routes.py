@@ -1,11 +1,18 @@
 from flask import Blueprint, render_template, redirect, url_for, request, flash
 from flask_login import login_required, current_user
 from app import db
-from app.models import User, Habit, HabitLog, Achievement, UserAchievement, DigitalTwin
+from app.models import User, Habit, HabitLog, Achievement, UserAchievement, DigitalTwin, UserDailyStats
 from datetime import datetime, timedelta
 
 gamification = Blueprint('gamification', __name__)
 
+def count_perfect_days(user_id, since, habit_count):
+    """Count days since the given date on which every habit was logged and completed"""
+    return sum(
+        1 for day in UserDailyStats.window(user_id, since)
+        if day.habits_logged == habit_count and day.habits_completed == habit_count
+    )
+
 def check_achievements():
     """Check if user has earned any new achievements"""
     # Get all available achievements
@@ -76,37 +83,25 @@ def check_achievements():
         elif criteria_type == 'detox':
             # Check if user has completed digital detox plans
             from app.models import DigitalDetoxPlan
-            completed_detox = DigitalDetoxPlan.query.filter_by(
-                user_id=current_user.id, 
-                is_active=False
-            ).count()
+            completed_detox = DigitalDetoxPlan.completed_count(current_user.id)
             
             if completed_detox >= criteria_value:
                 achievement_earned = True
         
         elif criteria_type == 'screentime':
             # Check if user has reduced screen time below threshold
-            from app.models import ScreenTimeLog
-            from datetime import datetime, timedelta
-            
-            # Get recent screen time logs (last 7 days)
+            # Get daily screen time totals for the last 7 days
             today = datetime.utcnow().date()
             week_ago = today - timedelta(days=7)
             
-            recent_logs = ScreenTimeLog.query.filter_by(user_id=current_user.id).\
-                filter(ScreenTimeLog.date >= week_ago).all()
+            daily_screen_time = [
+                day.screen_minutes for day in UserDailyStats.window(current_user.id, week_ago)
+                if day.top_app is not None
+            ]
             
-            if recent_logs:
+            if daily_screen_time:
                 # Calculate average daily screen time
-                daily_screen_time = {}
-                for log in recent_logs:
-                    date_str = log.date.strftime('%Y-%m-%d')
-                    if date_str in daily_screen_time:
-                        daily_screen_time[date_str] += log.usage_minutes
-                    else:
-                        daily_screen_time[date_str] = log.usage_minutes
-                
-                avg_screen_time = sum(daily_screen_time.values()) / len(daily_screen_time)
+                avg_screen_time = sum(daily_screen_time) / len(daily_screen_time)
                 
                 # Check if average is below threshold (criteria_value is in minutes)
                 if avg_screen_time <= criteria_value:
@@ -114,29 +109,13 @@ def check_achievements():
         
         elif criteria_type == 'perfect_week':
             # Check if user has completed all habits for a full week
-            from datetime import datetime, timedelta
-            
-            # Get logs from the last 7 days
+            # Get daily habit totals from the last 7 days
             today = datetime.utcnow().date()
             week_ago = today - timedelta(days=7)
             
-            recent_logs = HabitLog.query.filter_by(user_id=current_user.id).\
-                filter(HabitLog.date >= week_ago).all()
-            
-            if recent_logs and habits:
-                # Group logs by date
-                logs_by_date = {}
-                for log in recent_logs:
-                    date_str = log.date.strftime('%Y-%m-%d')
-                    if date_str not in logs_by_date:
-                        logs_by_date[date_str] = []
-                    logs_by_date[date_str].append(log)
-                
+            if habits:
                 # Check if there are 7 days with all habits completed
-                perfect_days = 0
-                for date, date_logs in logs_by_date.items():
-                    if len(date_logs) == habit_count and all(log.completed for log in date_logs):
-                        perfect_days += 1
+                perfect_days = count_perfect_days(current_user.id, week_ago, habit_count)
                 
                 if perfect_days >= criteria_value:  # criteria_value is number of perfect days needed
                     achievement_earned = True
@@ -195,18 +174,13 @@ def achievements():
     
     # Get habit stats
     habits = Habit.query.filter_by(user_id=current_user.id).all()
-    habit_logs = HabitLog.query.filter_by(user_id=current_user.id).all()
-    habits_completed = sum(1 for log in habit_logs if log.completed)
+    habits_completed = sum(habit.completed_logs for habit in habits)
     
     # Calculate longest streak
-    longest_streak = 0
-    for habit in habits:
-        streak = habit.current_streak()
-        if streak > longest_streak:
-            longest_streak = streak
+    longest_streak = max([habit.current_streak() for habit in habits], default=0)
             
     # Calculate completion rate
-    total_logs = len(habit_logs)
+    total_logs = sum(habit.total_logs for habit in habits)
     completion_rate = int((habits_completed / total_logs) * 100) if total_logs > 0 else 0
     
     # Get active habits count (habits with logs in the past 7 days)
@@ -346,8 +320,9 @@ def calculate_achievement_progress(achievement):
     
     if criteria_type == 'streak':
         # Find max streak across all habits
-        habits = Habit.query.filter_by(user_id=current_user.id).all()
-        max_streak = max([habit.current_streak() for habit in habits]) if habits else 0
+        max_streak = db.session.query(db.func.max(Habit.current_streak_days)).filter(
+            Habit.user_id == current_user.id
+        ).scalar() or 0
         progress = min(100, int((max_streak / max(1, criteria_value)) * 100))
     
     elif criteria_type == 'habits':
@@ -381,33 +356,21 @@ def calculate_achievement_progress(achievement):
     elif criteria_type == 'detox':
         # Count completed detox plans
         from app.models import DigitalDetoxPlan
-        completed_detox = DigitalDetoxPlan.query.filter_by(
-            user_id=current_user.id, 
-            is_active=False
-        ).count()
+        completed_detox = DigitalDetoxPlan.completed_count(current_user.id)
         progress = min(100, int((completed_detox / max(1, criteria_value)) * 100))
     
     elif criteria_type == 'screentime':
         # Calculate average screen time
-        from app.models import ScreenTimeLog
-        from datetime import datetime, timedelta
-        
         today = datetime.utcnow().date()
         week_ago = today - timedelta(days=7)
         
-        recent_logs = ScreenTimeLog.query.filter_by(user_id=current_user.id).\
-            filter(ScreenTimeLog.date >= week_ago).all()
+        daily_screen_time = [
+            day.screen_minutes for day in UserDailyStats.window(current_user.id, week_ago)
+            if day.top_app is not None
+        ]
         
-        if recent_logs:
-            daily_screen_time = {}
-            for log in recent_logs:
-                date_str = log.date.strftime('%Y-%m-%d')
-                if date_str in daily_screen_time:
-                    daily_screen_time[date_str] += log.usage_minutes
-                else:
-                    daily_screen_time[date_str] = log.usage_minutes
-            
-            avg_screen_time = sum(daily_screen_time.values()) / len(daily_screen_time)
+        if daily_screen_time:
+            avg_screen_time = sum(daily_screen_time) / len(daily_screen_time)
             
             # For screen time, lower is better, so invert the progress calculation
             if avg_screen_time <= criteria_value:
@@ -420,29 +383,13 @@ def calculate_achievement_progress(achievement):
     
     elif criteria_type == 'perfect_week':
         # Count perfect days in the last week
-        from datetime import datetime, timedelta
-        
         today = datetime.utcnow().date()
         week_ago = today - timedelta(days=7)
         
-        habits = Habit.query.filter_by(user_id=current_user.id).all()
-        habit_count = len(habits)
-        recent_logs = HabitLog.query.filter_by(user_id=current_user.id).\
-            filter(HabitLog.date >= week_ago).all()
+        habit_count = Habit.query.filter_by(user_id=current_user.id).count()
         
-        if recent_logs and habits:
-            logs_by_date = {}
-            for log in recent_logs:
-                date_str = log.date.strftime('%Y-%m-%d')
-                if date_str not in logs_by_date:
-                    logs_by_date[date_str] = []
-                logs_by_date[date_str].append(log)
-            
-            perfect_days = 0
-            for date, date_logs in logs_by_date.items():
-                if len(date_logs) == habit_count and all(log.completed for log in date_logs):
-                    perfect_days += 1
-            
+        if habit_count:
+            perfect_days = count_perfect_days(current_user.id, week_ago, habit_count)
             progress = min(100, int((perfect_days / max(1, criteria_value)) * 100))
     
     return progress
@@ -453,29 +400,30 @@ def leaderboard():
     # Get all users
     real_users = User.query.all()
     
+    # Gather per-user stats with one grouped query each instead of per-user queries
+    habit_totals = {
+        user_id: (completed, longest)
+        for user_id, completed, longest in db.session.query(
+            Habit.user_id,
+            db.func.sum(Habit.completed_logs),
+            db.func.max(Habit.current_streak_days)
+        ).group_by(Habit.user_id).all()
+    }
+    achievement_counts = dict(
+        db.session.query(UserAchievement.user_id, db.func.count(UserAchievement.id))
+        .group_by(UserAchievement.user_id)
+        .all()
+    )
+    
     # Calculate stats for each real user
     user_stats = []
     for user in real_users:
-        # Get habits completed
-        completed_habits = HabitLog.query.filter_by(user_id=user.id, completed=True).count()
-        
-        # Get longest streak
-        longest_streak = 0
-        habits = Habit.query.filter_by(user_id=user.id).all()
-        for habit in habits:
-            streak = habit.current_streak()
-            if streak > longest_streak:
-                longest_streak = streak
-        
-        # Get achievement count
-        achievement_count = UserAchievement.query.filter_by(user_id=user.id).count()
-        
         user_stats.append({
             'username': user.username,
             'profile_pic': user.profile_pic if hasattr(user, 'profile_pic') and user.profile_pic else 'default.jpg',
-            'completed_habits': completed_habits,
-            'longest_streak': longest_streak,
-            'achievements_count': achievement_count
+            'completed_habits': habit_totals.get(user.id, (0, 0))[0] or 0,
+            'longest_streak': habit_totals.get(user.id, (0, 0))[1] or 0,
+            'achievements_count': achievement_counts.get(user.id, 0)
         })
     
     # Add sample users if there are fewer than 10 real users
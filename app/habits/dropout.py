@@ -0,0 +1,252 @@
+import json
+from collections import namedtuple
+from datetime import datetime, timedelta
+import numpy as np
+from app import db
+from app.models import User, Habit, HabitLog, UserDailyStats
+
+# Days of history each feature row summarises (a whole number of weeks), and
+# the days after it in which a habit with no completion counts as dropped
+LOOKBACK_DAYS = 28
+HORIZON_DAYS = 14
+
+# Habits younger than this are not scored
+MIN_AGE_DAYS = 7
+
+FEATURES = (
+    'completion_rate',  # Share of lookback days completed
+    'streak',  # Consecutive completed days ending on the as-of day
+    'days_since_last',  # Days since the last completion (LOOKBACK_DAYS if none)
+    'longest_gap',  # Longest run of days without a completion
+    'weekday_variance',  # Variance of the completion rate across weekdays
+    'screen_hours',  # The user's average daily screen time
+)
+
+# weights[0] is the intercept; mean and std standardise the raw features
+DropoutModel = namedtuple('DropoutModel', ['weights', 'mean', 'std', 'trained_on', 'metrics'])
+TrainingSet = namedtuple('TrainingSet', ['X', 'y', 'as_of'])
+
+
+class History:
+    """Dense habits x days completion matrix and users x days screen minutes over a date span.
+
+    Built from three queries covering every habit, so features for any as-of
+    day inside the span are array slices.
+    """
+
+    def __init__(self, start, end):
+        self.start = start
+        self.days = (end - start).days + 1
+        habits = db.session.query(Habit.id, Habit.user_id, Habit.created_at).order_by(Habit.id).all()
+        self.habit_ids = np.array([row[0] for row in habits], dtype=np.int64)
+        user_ids = sorted({row[1] for row in habits})
+        user_index = {user_id: i for i, user_id in enumerate(user_ids)}
+        self.habit_user = np.array([user_index[row[1]] for row in habits], dtype=np.int64)
+        self.created = np.array([
+            (row[2].date() - start).days if row[2] else -self.days for row in habits
+        ], dtype=np.int64)
+
+        habit_index = {habit_id: i for i, habit_id in enumerate(self.habit_ids.tolist())}
+        self.completed = np.zeros((len(habits), self.days), dtype=bool)
+        logs = db.session.query(HabitLog.habit_id, HabitLog.date).filter(
+            HabitLog.completed == True, HabitLog.date >= start, HabitLog.date <= end
+        ).all()
+        logs = [(habit_index[h], (day - start).days) for h, day in logs if h in habit_index]
+        if logs:
+            rows, cols = np.array(logs).T
+            self.completed[rows, cols] = True
+
+        self.screen = np.zeros((len(user_ids), self.days))
+        stats = db.session.query(UserDailyStats.user_id, UserDailyStats.date, UserDailyStats.screen_minutes).filter(
+            UserDailyStats.date >= start, UserDailyStats.date <= end
+        ).all()
+        stats = [(user_index[u], (day - start).days, minutes) for u, day, minutes in stats if u in user_index]
+        if stats:
+            rows, cols, minutes = np.array(stats).T
+            self.screen[rows.astype(int), cols.astype(int)] = minutes
+
+    def index(self, day):
+        return (day - self.start).days
+
+    def eligible(self, day):
+        """Habits old enough to score on day"""
+        return self.created <= self.index(day) - MIN_AGE_DAYS
+
+    def features(self, day):
+        """Raw feature matrix (habits x FEATURES) for the LOOKBACK_DAYS ending on day"""
+        end = self.index(day) + 1
+        window = self.completed[:, end - LOOKBACK_DAYS:end]
+        idx = np.arange(LOOKBACK_DAYS)
+
+        # Index of the latest completed (or missed) day at or before each day, -1 if none yet
+        last_done = np.maximum.accumulate(np.where(window, idx, -1), axis=1)
+        last_missed = np.maximum.accumulate(np.where(window, -1, idx), axis=1)
+
+        weekday_rates = window.reshape(len(window), LOOKBACK_DAYS // 7, 7).mean(axis=1)
+        screen = self.screen[:, end - LOOKBACK_DAYS:end].mean(axis=1) / 60
+        return np.column_stack([
+            window.mean(axis=1),
+            LOOKBACK_DAYS - 1 - last_missed[:, -1],
+            LOOKBACK_DAYS - 1 - last_done[:, -1],
+            (idx - last_done).max(axis=1),
+            weekday_rates.var(axis=1),
+            screen[self.habit_user],
+        ]).astype(float)
+
+    def dropped(self, day):
+        """Whether each habit had no completion in the HORIZON_DAYS after day"""
+        start = self.index(day) + 1
+        return ~self.completed[:, start:start + HORIZON_DAYS].any(axis=1)
+
+
+def training_set(end=None, days=180, step=7):
+    """Feature rows and dropout labels for every eligible habit every step days.
+
+    As-of days run from days before end up to the last day whose horizon has
+    fully passed by end (today by default).
+    """
+    end = end or datetime.utcnow().date()
+    last = end - timedelta(days=HORIZON_DAYS)
+    first = last - timedelta(days=days)
+    history = History(first - timedelta(days=LOOKBACK_DAYS - 1), end)
+
+    X, y, as_of = [], [], []
+    day = first
+    while day <= last:
+        mask = history.eligible(day)
+        X.append(history.features(day)[mask])
+        y.append(history.dropped(day)[mask])
+        as_of.append(np.full(mask.sum(), history.index(day)))
+        day += timedelta(days=step)
+    return TrainingSet(np.vstack(X), np.concatenate(y).astype(float), np.concatenate(as_of))
+
+
+def _sigmoid(z):
+    return 1 / (1 + np.exp(-np.clip(z, -30, 30)))
+
+
+def _design(X, mean, std):
+    return np.column_stack([np.ones(len(X)), (X - mean) / std])
+
+
+def fit(X, y, l2=1.0, iterations=25, tol=1e-8):
+    """Fit L2-regularised logistic regression by Newton's method; returns a DropoutModel"""
+    mean = X.mean(axis=0)
+    std = X.std(axis=0)
+    std[std == 0] = 1
+    A = _design(X, mean, std)
+    penalty = np.full(A.shape[1], float(l2))
+    penalty[0] = 0  # The intercept is not regularised
+
+    weights = np.zeros(A.shape[1])
+    for _ in range(iterations):
+        p = _sigmoid(A @ weights)
+        gradient = A.T @ (p - y) + penalty * weights
+        hessian = (A * (p * (1 - p))[:, None]).T @ A + np.diag(penalty)
+        step = np.linalg.solve(hessian, gradient)
+        weights -= step
+        if np.abs(step).max() < tol:
+            break
+    return DropoutModel(weights, mean, std, datetime.utcnow().date().isoformat(), {})
+
+
+def predict(model, X):
+    """Dropout probability for each feature row"""
+    return _sigmoid(_design(X, model.mean, model.std) @ model.weights)
+
+
+def auc(y, scores):
+    """Area under the ROC curve from the rank-sum statistic (ties get average ranks)"""
+    y = np.asarray(y, dtype=bool)
+    positives, negatives = y.sum(), (~y).sum()
+    if not positives or not negatives:
+        return float('nan')
+    order = np.argsort(scores, kind='mergesort')
+    # Tied scores share the average of their 1-based ranks
+    _, first, counts = np.unique(np.asarray(scores)[order], return_index=True, return_counts=True)
+    ranks = np.empty(len(order))
+    ranks[order] = np.repeat(first + (counts + 1) / 2, counts)
+    return float((ranks[y].sum() - positives * (positives + 1) / 2) / (positives * negatives))
+
+
+def evaluate(model, X, y):
+    """Log loss, AUC and accuracy at 0.5, next to the old fixed 30% completion-rate rule"""
+    p = predict(model, X)
+    eps = 1e-12
+    rule = X[:, FEATURES.index('completion_rate')] < 0.3
+    return {
+        'rows': int(len(y)),
+        'dropout_rate': float(y.mean()) if len(y) else float('nan'),
+        'log_loss': float(-np.mean(y * np.log(p + eps) + (1 - y) * np.log(1 - p + eps))),
+        'auc': auc(y, p),
+        'accuracy': float(np.mean((p >= 0.5) == y)),
+        'rule_auc': auc(y, -X[:, FEATURES.index('completion_rate')]),
+        'rule_accuracy': float(np.mean(rule == y)),
+    }
+
+
+def train(end=None, days=180, step=7, l2=1.0, holdout=0.25):
+    """Train on all users' histories, holding out the latest as-of days for evaluation.
+
+    Returns the model refitted on every row, with holdout metrics attached.
+    """
+    data = training_set(end=end, days=days, step=step)
+    if not len(data.y):
+        raise ValueError('No habits old enough to train on')
+    if data.y.min() == data.y.max():
+        raise ValueError('Training data needs both dropped and kept habits')
+    as_of_days = np.unique(data.as_of)
+    cutoff = as_of_days[int(len(as_of_days) * (1 - holdout))] if len(as_of_days) > 1 else as_of_days[-1] + 1
+    test = data.as_of >= cutoff
+
+    metrics = {}
+    if test.any() and (~test).any():
+        metrics = evaluate(fit(data.X[~test], data.y[~test], l2=l2), data.X[test], data.y[test])
+    model = fit(data.X, data.y, l2=l2)
+    return model._replace(metrics=metrics)
+
+
+def save_model(model, path):
+    with open(path, 'w') as f:
+        json.dump({
+            'features': FEATURES,
+            'lookback_days': LOOKBACK_DAYS,
+            'horizon_days': HORIZON_DAYS,
+            'weights': model.weights.tolist(),
+            'mean': model.mean.tolist(),
+            'std': model.std.tolist(),
+            'trained_on': model.trained_on,
+            'metrics': model.metrics,
+        }, f, indent=2)
+
+
+def load_model(path):
+    with open(path) as f:
+        data = json.load(f)
+    if tuple(data['features']) != FEATURES or data['lookback_days'] != LOOKBACK_DAYS:
+        raise ValueError('Dropout model was trained on different features; retrain it')
+    return DropoutModel(
+        np.array(data['weights']), np.array(data['mean']), np.array(data['std']), data['trained_on'], data['metrics']
+    )
+
+
+def score_habits(model, day=None):
+    """Score every habit of every user in one matrix product and store the results.
+
+    Habits too young to score get None. Bumps the data version of users whose
+    habits were scored. Returns the number of habits scored; the caller commits.
+    """
+    day = day or datetime.utcnow().date()
+    history = History(day - timedelta(days=LOOKBACK_DAYS - 1), day)
+    if not len(history.habit_ids):
+        return 0
+    mask = history.eligible(day)
+    risk = predict(model, history.features(day))
+
+    db.session.bulk_update_mappings(Habit, [
+        {'id': habit_id, 'dropout_risk': float(p) if ok else None, 'dropout_scored_on': day}
+        for habit_id, p, ok in zip(history.habit_ids.tolist(), risk, mask)
+    ])
+    user_ids = db.session.query(Habit.user_id).distinct()
+    User.bump_data_version(*[user_id for (user_id,) in user_ids])
+    return int(mask.sum())
@@ -1,8 +1,9 @@
-from flask import Blueprint, render_template, url_for, flash, redirect, request
+from flask import Blueprint, render_template, url_for, flash, redirect, request, jsonify, abort
 from flask_login import login_required, current_user
 from app import db
-from app.models import Habit, HabitLog, DigitalTwin
+from app.models import User, Habit, HabitLog, DigitalTwin, UserDailyStats
 from app.habits.forms import HabitForm, HabitLogForm
+from app.timeseries import chart_args, bucketize, series_payload
 from datetime import datetime, timedelta
 import random
 
@@ -27,6 +28,7 @@ def new_habit():
             user_id=current_user.id
         )
         db.session.add(habit)
+        User.bump_data_version(current_user.id)
         db.session.commit()
         
         # Create a digital twin for this habit
@@ -91,6 +93,47 @@ def habit(habit_id):
         date_logs=date_logs
     )
 
+@habits.route('/habits/api/charts/completion')
+@login_required
+def completion_chart():
+    """Habit completion percentage per day, week or month bucket.
+    
+    Covers all of the user's habits, or one with habit_id. Takes bucket,
+    start, end (YYYY-MM-DD) and max_points; longer series are decimated with
+    LTTB so the response stays bounded for any history.
+    """
+    try:
+        bucket, start, end, max_points = chart_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    habit_id = request.args.get('habit_id', type=int)
+    if habit_id is not None:
+        habit = Habit.query.get_or_404(habit_id)
+        if habit.user_id != current_user.id:
+            abort(404)
+        day_column = HabitLog.date
+        query = db.session.query(
+            HabitLog.date,
+            db.func.count(HabitLog.id),
+            db.func.sum(db.case((HabitLog.completed == True, 1), else_=0))
+        ).filter(HabitLog.habit_id == habit_id).group_by(HabitLog.date)
+    else:
+        day_column = UserDailyStats.date
+        query = db.session.query(
+            UserDailyStats.date, UserDailyStats.habits_logged, UserDailyStats.habits_completed
+        ).filter(UserDailyStats.user_id == current_user.id, UserDailyStats.habits_logged > 0)
+    if start is not None:
+        query = query.filter(day_column >= start)
+    if end is not None:
+        query = query.filter(day_column <= end)
+    rows = query.order_by(day_column).all()
+    
+    keys, (logged, completed), _ = bucketize(
+        [row[0] for row in rows], [[row[1] for row in rows], [row[2] or 0 for row in rows]], bucket
+    )
+    return jsonify(series_payload(keys, completed * 100 / logged.clip(min=1), bucket, max_points))
+
 @habits.route('/habits/<int:habit_id>/update', methods=['GET', 'POST'])
 @login_required
 def update_habit(habit_id):
@@ -105,6 +148,7 @@ def update_habit(habit_id):
         habit.description = form.description.data
         habit.frequency = form.frequency.data
         habit.goal = form.goal.data
+        User.bump_data_version(current_user.id)
         db.session.commit()
         flash('Your habit has been updated!', 'success')
         return redirect(url_for('habits.habit', habit_id=habit.id))
@@ -124,14 +168,17 @@ def delete_habit(habit_id):
         flash('You do not have permission to delete this habit.', 'danger')
         return redirect(url_for('habits.view_habits'))
     
-    # Delete associated logs
+    # Delete associated logs and refresh the daily rollup for the days they covered
+    logged_dates = [row.date for row in db.session.query(HabitLog.date).filter_by(habit_id=habit.id).distinct()]
     HabitLog.query.filter_by(habit_id=habit.id).delete()
+    UserDailyStats.refresh_habits(current_user.id, logged_dates)
     
     # Delete digital twin
     DigitalTwin.query.filter_by(habit_id=habit.id, user_id=current_user.id).delete()
     
     # Delete habit
     db.session.delete(habit)
+    User.bump_data_version(current_user.id)
     db.session.commit()
     flash('Your habit has been deleted!', 'success')
     return redirect(url_for('habits.view_habits'))
@@ -156,8 +203,12 @@ def log_habit(habit_id):
     
     if form.validate_on_submit():
         if existing_log:
+            was_completed = existing_log.completed
             existing_log.completed = form.completed.data
             existing_log.notes = form.notes.data
+            habit.record_log(today, form.completed.data, was_completed=was_completed)
+            UserDailyStats.refresh_habits(current_user.id, [today])
+            User.bump_data_version(current_user.id)
             db.session.commit()
             flash('Your habit log has been updated!', 'success')
         else:
@@ -169,6 +220,9 @@ def log_habit(habit_id):
                 date=today
             )
             db.session.add(log)
+            habit.record_log(today, form.completed.data)
+            UserDailyStats.refresh_habits(current_user.id, [today])
+            User.bump_data_version(current_user.id)
             db.session.commit()
             flash('Your habit has been logged!', 'success')
             
@@ -306,15 +360,10 @@ def habit_calendar(year=None, month=None):
     else:
         prev_month_start_full = datetime(prev_month_start.year, prev_month_start.month, 1).date()
     
-    prev_month_logs = HabitLog.query.filter_by(
-        user_id=current_user.id
-    ).filter(
-        HabitLog.date >= prev_month_start_full,
-        HabitLog.date < start_of_month
-    ).all()
+    prev_month_stats = UserDailyStats.window(current_user.id, prev_month_start_full, prev_month_start)
     
-    prev_total_logs = len(prev_month_logs)
-    prev_completed_logs = sum(1 for log in prev_month_logs if log.completed)
+    prev_total_logs = sum(day.habits_logged for day in prev_month_stats)
+    prev_completed_logs = sum(day.habits_completed for day in prev_month_stats)
     prev_completion_rate = round((prev_completed_logs / prev_total_logs) * 100) if prev_total_logs > 0 else 0
     
     # Calculate the change
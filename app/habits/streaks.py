@@ -0,0 +1,113 @@
+from collections import namedtuple
+import numpy as np
+from app import db
+from app.models import Habit, HabitLog
+
+# Current and longest run of consecutive completed days for a habit
+Streak = namedtuple('Streak', ['current', 'longest'])
+NO_STREAK = Streak(0, 0)
+
+
+class StreakMap(dict):
+    """Streaks keyed by habit id. Habits without completions get NO_STREAK."""
+
+    def __missing__(self, habit_id):
+        return NO_STREAK
+
+
+def _completed_days(user_id=None, habit_ids=None):
+    """Distinct completed (habit_id, date) rows ordered by habit and date"""
+    query = db.session.query(
+        HabitLog.habit_id, HabitLog.date
+    ).filter(
+        HabitLog.completed == True
+    )
+    if user_id is not None:
+        query = query.filter(HabitLog.user_id == user_id)
+    if habit_ids is not None:
+        query = query.filter(HabitLog.habit_id.in_(habit_ids))
+
+    return query.distinct().order_by(HabitLog.habit_id, HabitLog.date).all()
+
+
+def _islands(rows):
+    """Find runs of consecutive days per habit in one vectorized pass.
+
+    Returns (habit_ids, current, longest) arrays with one entry per
+    habit. The current streak is the run ending at the habit's most recent
+    completion, matching the original Habit.current_streak() behaviour.
+    """
+    count = len(rows)
+    habit = np.fromiter((row[0] for row in rows), dtype=np.int64, count=count)
+    day = np.fromiter((row[1].toordinal() for row in rows), dtype=np.int64, count=count)
+
+    # A new island starts on a new habit or whenever a day is skipped
+    new_island = np.ones(count, dtype=bool)
+    new_island[1:] = (habit[1:] != habit[:-1]) | (day[1:] - day[:-1] != 1)
+    island_starts = np.flatnonzero(new_island)
+    island_lengths = np.diff(np.append(island_starts, count))
+    island_habits = habit[island_starts]
+
+    # Group the islands by habit
+    habit_starts = np.flatnonzero(np.r_[True, island_habits[1:] != island_habits[:-1]])
+    habit_ends = np.append(habit_starts[1:], len(island_starts)) - 1
+
+    longest = np.maximum.reduceat(island_lengths, habit_starts)
+    current = island_lengths[habit_ends]
+    return island_habits[habit_starts], current, longest
+
+
+def calculate_streaks(user_id=None, habit_ids=None):
+    """Calculate current and longest streaks for many habits with a single query.
+
+    Pass a user_id to cover all of that user's habits, habit_ids to restrict
+    the calculation to specific habits, or neither to cover every user.
+    """
+    streaks = StreakMap()
+    rows = _completed_days(user_id=user_id, habit_ids=habit_ids)
+    if not rows:
+        return streaks
+
+    habits, current, longest = _islands(rows)
+    for habit_id, current_streak, longest_streak in zip(habits.tolist(), current.tolist(), longest.tolist()):
+        streaks[habit_id] = Streak(current_streak, longest_streak)
+    return streaks
+
+
+def rebuild_habit_stats(user_id=None):
+    """Re-derive the stored Habit counters from log history.
+
+    Covers every habit, or just one user's habits. Returns the number of
+    habits updated; the caller commits.
+    """
+    streaks = calculate_streaks(user_id=user_id)
+
+    counts = db.session.query(
+        HabitLog.habit_id,
+        db.func.count(HabitLog.id),
+        db.func.sum(db.case((HabitLog.completed == True, 1), else_=0)),
+        db.func.max(db.case((HabitLog.completed == True, HabitLog.date), else_=None))
+    ).group_by(HabitLog.habit_id)
+    if user_id is not None:
+        counts = counts.filter(HabitLog.user_id == user_id)
+    counts = {row[0]: row[1:] for row in counts.all()}
+
+    habit_ids = db.session.query(Habit.id)
+    if user_id is not None:
+        habit_ids = habit_ids.filter(Habit.user_id == user_id)
+
+    mappings = []
+    for (habit_id,) in habit_ids.all():
+        total, completed, last_completed = counts.get(habit_id, (0, 0, None))
+        streak = streaks[habit_id]
+        mappings.append({
+            'id': habit_id,
+            'current_streak_days': streak.current,
+            'longest_streak_days': streak.longest,
+            'last_completed_date': last_completed,
+            'total_logs': total,
+            'completed_logs': completed or 0
+        })
+
+    db.session.bulk_update_mappings(Habit, mappings)
+    return len(mappings)
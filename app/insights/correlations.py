@@ -0,0 +1,101 @@
+import math
+from collections import namedtuple
+import numpy as np
+from app import db
+from app.models import HabitLog, UserDailyStats
+
+# Habits need at least this many completed and missed days with screen time to be scored
+MIN_GROUP_DAYS = 2
+
+# r is the point-biserial correlation between completing the habit and that
+# day's screen minutes; negative means less screen time on completion days
+HabitCorrelation = namedtuple(
+    'HabitCorrelation', ['habit_id', 'days', 'completed_days', 'r', 'p_value', 'mean_completed', 'mean_missed']
+)
+
+
+def completion_matrix(user_id, habit_ids, since=None):
+    """Build a days x habits completion matrix aligned with daily screen minutes.
+
+    Rows are the user's days with screen time data (oldest first), columns
+    follow habit_ids. Returns (days, minutes, observed, completed) where
+    observed marks the days a habit was logged and completed the days it was
+    logged as done. Uses one query for the rollup and one for the habit logs.
+    """
+    stats = db.session.query(UserDailyStats.date, UserDailyStats.screen_minutes).filter(
+        UserDailyStats.user_id == user_id, UserDailyStats.top_app.isnot(None)
+    )
+    logs = db.session.query(HabitLog.habit_id, HabitLog.date, HabitLog.completed).filter(
+        HabitLog.user_id == user_id, HabitLog.habit_id.in_(habit_ids)
+    )
+    if since is not None:
+        stats = stats.filter(UserDailyStats.date >= since)
+        logs = logs.filter(HabitLog.date >= since)
+    stats = stats.order_by(UserDailyStats.date).all()
+    logs = logs.all()
+
+    days = np.array([row[0] for row in stats], dtype='datetime64[D]')
+    minutes = np.array([row[1] for row in stats], dtype=float)
+    observed = np.zeros((len(days), len(habit_ids)), dtype=bool)
+    completed = np.zeros_like(observed)
+    if not len(days) or not logs:
+        return days, minutes, observed, completed
+
+    column = {habit_id: j for j, habit_id in enumerate(habit_ids)}
+    log_days = np.array([row[1] for row in logs], dtype='datetime64[D]')
+    cols = np.array([column[row[0]] for row in logs])
+    done = np.array([bool(row[2]) for row in logs])
+
+    # Keep only logs on days that have screen time data
+    rows = np.searchsorted(days, log_days).clip(max=len(days) - 1)
+    matched = days[rows] == log_days
+    observed[rows[matched], cols[matched]] = True
+    completed[rows[matched], cols[matched]] = done[matched]
+    return days, minutes, observed, completed
+
+
+def point_biserial(minutes, observed, completed):
+    """Point-biserial r and two-sided p-value for every column at once.
+
+    Each column only uses its observed rows. The p-value uses the Fisher z
+    approximation. Columns with fewer than MIN_GROUP_DAYS completed or missed
+    days, or no variation in screen time, get NaN.
+    """
+    observed = observed.astype(float)
+    completed = completed.astype(float)
+    n = observed.sum(axis=0)
+    n1 = completed.sum(axis=0)
+    n0 = n - n1
+    total = minutes @ observed
+    total_completed = minutes @ completed
+    total_squares = (minutes * minutes) @ observed
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_completed = total_completed / n1
+        mean_missed = (total - total_completed) / n0
+        variance = total_squares / n - (total / n) ** 2
+        r = (mean_completed - mean_missed) / np.sqrt(variance) * np.sqrt(n1 * n0) / n
+        usable = (n1 >= MIN_GROUP_DAYS) & (n0 >= MIN_GROUP_DAYS) & (variance > 1e-9)
+        r = np.where(usable, np.clip(r, -1.0, 1.0), np.nan)
+        z = np.abs(np.arctanh(np.clip(r, -0.999999, 0.999999))) * np.sqrt(n - 3)
+    p_value = np.array([math.erfc(value / math.sqrt(2)) if np.isfinite(value) else np.nan for value in z])
+    return n, n1, r, p_value, mean_completed, mean_missed
+
+
+def habit_screen_time_correlations(user_id, habit_ids, since=None):
+    """Correlate completion of each habit with daily screen minutes.
+
+    Returns a HabitCorrelation per habit in habit_ids, in the same order; r
+    and p_value are NaN for habits without enough data. Work is
+    O(days x habits) with no per-habit queries.
+    """
+    habit_ids = list(habit_ids)
+    if not habit_ids:
+        return []
+    _, minutes, observed, completed = completion_matrix(user_id, habit_ids, since)
+    n, n1, r, p_value, mean_completed, mean_missed = point_biserial(minutes, observed, completed)
+    return [
+        HabitCorrelation(habit_id, int(n[j]), int(n1[j]), float(r[j]), float(p_value[j]),
+                         float(mean_completed[j]), float(mean_missed[j]))
+        for j, habit_id in enumerate(habit_ids)
+    ]
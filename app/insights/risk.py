@@ -0,0 +1,107 @@
+from collections import namedtuple
+from datetime import timedelta
+import numpy as np
+from app import db
+from app.models import HabitLog, UserDailyStats
+
+# Days of logs each assessment looks back over, ending today
+RISK_WINDOW_DAYS = 28
+
+# A habit needs this many logs in the window before it is judged at all
+MIN_LOGS = 3
+
+# At-risk thresholds: completion rate, weekly change in completion rate,
+# and extra screen time on missed days relative to the user's average
+LOW_COMPLETION_RATE = 0.5
+FALLING_TREND = -0.1
+HIGH_SCREEN_IMPACT = 0.25
+
+# completion_rate is over the logged days in the window; trend is the
+# least-squares change in completion rate per week; screen_impact is how much
+# more screen time missed days have than completed days, as a fraction of the
+# average (0 when there are too few tracked days of either kind)
+HabitRisk = namedtuple('HabitRisk', ['habit_id', 'logs', 'completion_rate', 'trend', 'screen_impact', 'reason'])
+
+
+def _window(user_id, habit_ids, start, end):
+    """One query: each habit log in the window with that day's screen minutes (None if untracked)"""
+    return db.session.query(
+        HabitLog.habit_id, HabitLog.date, HabitLog.completed, UserDailyStats.screen_minutes, UserDailyStats.top_app
+    ).outerjoin(UserDailyStats, db.and_(
+        UserDailyStats.user_id == HabitLog.user_id,
+        UserDailyStats.date == HabitLog.date
+    )).filter(
+        HabitLog.user_id == user_id,
+        HabitLog.habit_id.in_(habit_ids),
+        HabitLog.date >= start,
+        HabitLog.date <= end
+    ).all()
+
+
+def _reason(rate, trend, impact):
+    if rate < LOW_COMPLETION_RATE:
+        return f"Low completion rate ({int(rate * 100)}%). Try setting reminders."
+    if trend < FALLING_TREND:
+        return f"Completion is falling by about {int(-trend * 100)} points a week. Revisit your goal or schedule."
+    if impact > HIGH_SCREEN_IMPACT:
+        return (f"About {int(impact * 100)}% more screen time on days when this habit is missed. "
+                "Consider reducing app usage.")
+    return None
+
+
+def assess_habits(user_id, habit_ids, today, window_days=RISK_WINDOW_DAYS):
+    """Completion rate, trend and screen-time impact for each habit, in habit_ids order.
+
+    Everything comes from one windowed query and a few days x habits matrix
+    products, so results are deterministic and cheap. reason is None unless
+    the habit is at risk.
+    """
+    habit_ids = list(habit_ids)
+    if not habit_ids:
+        return []
+    start = today - timedelta(days=window_days - 1)
+    rows = _window(user_id, habit_ids, start, today)
+
+    column = {habit_id: j for j, habit_id in enumerate(habit_ids)}
+    observed = np.zeros((window_days, len(habit_ids)))
+    completed = np.zeros_like(observed)
+    minutes = np.full(window_days, np.nan)
+    if rows:
+        day = np.array([(row[1] - start).days for row in rows])
+        col = np.array([column[row[0]] for row in rows])
+        observed[day, col] = 1
+        completed[day, col] = [bool(row[2]) for row in rows]
+        tracked_rows = np.array([row[4] is not None for row in rows])
+        minutes[day[tracked_rows]] = [row[3] for row in rows if row[4] is not None]
+    missed = observed - completed
+    t = np.arange(window_days, dtype=float)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        n = observed.sum(axis=0)
+        rate = completed.sum(axis=0) / n
+
+        # Least-squares slope of completed (0/1) against day over each habit's logged days
+        sum_t, sum_tt = t @ observed, (t * t) @ observed
+        trend = (n * (t @ completed) - sum_t * completed.sum(axis=0)) / (n * sum_tt - sum_t ** 2) * 7
+
+        # Mean screen minutes on completed and missed days, over tracked days only
+        tracked = ~np.isnan(minutes)
+        screen = np.where(tracked, minutes, 0)
+        done_days, missed_days = tracked @ completed, tracked @ missed
+        mean_done = screen @ completed / done_days
+        mean_missed = screen @ missed / missed_days
+        average = screen @ observed / (done_days + missed_days)
+        impact = (mean_missed - mean_done) / average
+
+    trend = np.where(np.isfinite(trend), trend, 0.0)
+    usable = (done_days >= 2) & (missed_days >= 2) & (average > 0)
+    impact = np.where(usable, impact, 0.0)
+
+    results = []
+    for j, habit_id in enumerate(habit_ids):
+        logs = int(n[j])
+        reason = _reason(rate[j], trend[j], impact[j]) if logs >= MIN_LOGS else None
+        results.append(HabitRisk(
+            habit_id, logs, float(rate[j]) if logs else 0.0, float(trend[j]), float(impact[j]), reason
+        ))
+    return results
@@ -1,12 +1,26 @@
-from flask import Blueprint, render_template, jsonify, flash, redirect, url_for
+from flask import Blueprint, render_template, jsonify, flash, redirect, url_for, request
 from flask_login import login_required, current_user
-from app.models import Habit, HabitLog, ScreenTimeLog, DigitalDetoxPlan, AppLimit
+from app import insights_cache, usage_cache
+from app.models import (
+    Habit, ScreenTimeLog, DigitalDetoxPlan, AppLimit, UserDailyStats, WellbeingScore, ScreenTimeTrend
+)
+from app.insights.correlations import habit_screen_time_correlations
+from app.insights.risk import assess_habits
 from datetime import datetime, timedelta
-import random
-import numpy as np
 
 insights = Blueprint('insights', __name__)
 
+# Days of history habit/screen time correlations look at, and the p-value they must beat
+CORRELATION_DAYS = 90
+CORRELATION_SIGNIFICANCE = 0.05
+
+# Days of stored wellbeing scores charted on the insights page, and the API cap
+SCORE_HISTORY_DAYS = 30
+MAX_SCORE_HISTORY_DAYS = 730
+
+# Stored dropout model probability at which a habit is flagged as at risk
+DROPOUT_RISK_THRESHOLD = 0.5
+
 def generate_habit_suggestions(user_habits, screen_time_logs):
     """Generate habit suggestions based on user data"""
     suggestions = []
@@ -34,26 +48,21 @@ def generate_habit_suggestions(user_habits, screen_time_logs):
     return suggestions
 
 def predict_habit_dropout(habit):
-    """Predict if user is likely to drop a habit"""
-    # Get recent logs
-    recent_logs = HabitLog.query.filter_by(habit_id=habit.id).order_by(HabitLog.date.desc()).limit(10).all()
-    
-    # If fewer than 3 logs, not enough data
-    if len(recent_logs) < 3:
+    """Predict if user is likely to drop a habit, from the nightly dropout model score"""
+    if habit.dropout_risk is None:
         return False, "Not enough data"
     
-    # Calculate completion rate for recent logs
-    completed = sum(1 for log in recent_logs if log.completed)
-    completion_rate = completed / len(recent_logs)
-    
-    # If completion rate is low, predict dropout
-    if completion_rate < 0.3:
-        return True, f"Low completion rate ({completion_rate:.0%})"
+    if habit.dropout_risk >= DROPOUT_RISK_THRESHOLD:
+        return True, f"{habit.dropout_risk:.0%} predicted risk of not completing it in the next two weeks."
     
     return False, "Habit is on track"
 
-def generate_wellbeing_insights(screen_time_logs, active_detox_plan, app_limits):
-    """Generate insights about digital wellbeing"""
+def generate_wellbeing_insights(screen_time_logs, active_detox_plan, app_limits, trends):
+    """Generate insights about digital wellbeing.
+    
+    trends maps window days to the stored daily screen time slope (minutes
+    per day), shortest window first, as returned by ScreenTimeTrend.slopes.
+    """
     insights = {
         "summary": "",
         "screen_time_trend": "",
@@ -90,30 +99,21 @@ def generate_wellbeing_insights(screen_time_logs, active_detox_plan, app_limits)
     else:
         insights["summary"] = "Your screen time is significantly impacting your wellbeing. Urgent action recommended."
     
-    # Analyze screen time trend
-    if len(screen_time_logs) >= 3:
-        # Sort logs by date
-        sorted_logs = sorted(screen_time_logs, key=lambda x: x.date)
-        
-        # Calculate trend (simple linear regression)
-        dates = [(log.date - sorted_logs[0].date).days for log in sorted_logs]
-        minutes = [log.usage_minutes for log in sorted_logs]
-        
-        if len(dates) > 1 and len(set(dates)) > 1:  # Ensure we have different dates
-            slope = np.polyfit(dates, minutes, 1)[0]
-            
-            if slope < -10:  # Significant decrease
-                insights["screen_time_trend"] = "Your screen time is decreasing significantly. Great job!"
-            elif slope < 0:  # Slight decrease
-                insights["screen_time_trend"] = "Your screen time is gradually decreasing. Keep it up!"
-            elif slope < 10:  # Slight increase
-                insights["screen_time_trend"] = "Your screen time is slightly increasing. Be mindful of your usage."
-            else:  # Significant increase
-                insights["screen_time_trend"] = "Your screen time is increasing significantly. Consider implementing more limits."
-        else:
-            insights["screen_time_trend"] = "Not enough data to determine screen time trend."
-    else:
+    # Analyze screen time trend from the shortest window with enough tracked days
+    insights["screen_time_trends"] = {
+        window: round(slope, 1) if slope is not None else None for window, slope in trends.items()
+    }
+    slope = next((slope for slope in trends.values() if slope is not None), None)
+    if slope is None:
         insights["screen_time_trend"] = "Not enough data to determine screen time trend."
+    elif slope < -10:  # Significant decrease
+        insights["screen_time_trend"] = "Your screen time is decreasing significantly. Great job!"
+    elif slope < 0:  # Slight decrease
+        insights["screen_time_trend"] = "Your screen time is gradually decreasing. Keep it up!"
+    elif slope < 10:  # Slight increase
+        insights["screen_time_trend"] = "Your screen time is slightly increasing. Be mindful of your usage."
+    else:  # Significant increase
+        insights["screen_time_trend"] = "Your screen time is increasing significantly. Consider implementing more limits."
     
     # Analyze detox impact
     if active_detox_plan:
@@ -145,76 +145,32 @@ def generate_wellbeing_insights(screen_time_logs, active_detox_plan, app_limits)
     
     return insights
 
-def calculate_habit_screen_time_correlations(habits, screen_time_logs):
-    """Calculate correlations between habits and screen time"""
-    correlations = []
-    
-    if not habits or not screen_time_logs or len(habits) < 2 or len(screen_time_logs) < 3:
-        # Sample correlation for demonstration
-        correlations.append({
-            "title": "Meditation & Screen Time",
-            "description": "Days when you meditate tend to have lower screen time.",
-            "strength": 65
-        })
-        return correlations
+def calculate_habit_screen_time_correlations(habits, user_id, since=None):
+    """Describe the habits whose completion is significantly linked to daily screen time"""
+    results = habit_screen_time_correlations(user_id, [h.id for h in habits], since)
+    names = {h.id: h.name for h in habits}
     
-    # Group screen time logs by date
-    screen_time_by_date = {}
-    for log in screen_time_logs:
-        date_str = log.date.strftime("%Y-%m-%d")
-        if date_str in screen_time_by_date:
-            screen_time_by_date[date_str] += log.usage_minutes
-        else:
-            screen_time_by_date[date_str] = log.usage_minutes
+    # Habits without enough data have a NaN p-value and drop out here
+    significant = [c for c in results if c.p_value < CORRELATION_SIGNIFICANCE]
     
-    # For each habit, check correlation with screen time
-    for habit in habits:
-        habit_logs = HabitLog.query.filter_by(habit_id=habit.id).all()
-        
-        # Skip if not enough logs
-        if len(habit_logs) < 3:
-            continue
-        
-        # Count days when habit was completed and screen time was recorded
-        completed_days_screen_time = []
-        incomplete_days_screen_time = []
-        
-        for log in habit_logs:
-            date_str = log.date.strftime("%Y-%m-%d")
-            if date_str in screen_time_by_date:
-                if log.completed:
-                    completed_days_screen_time.append(screen_time_by_date[date_str])
-                else:
-                    incomplete_days_screen_time.append(screen_time_by_date[date_str])
-        
-        # Skip if not enough data points
-        if len(completed_days_screen_time) < 2 or len(incomplete_days_screen_time) < 2:
-            continue
-        
-        # Calculate average screen time for completed vs incomplete days
-        avg_completed = sum(completed_days_screen_time) / len(completed_days_screen_time)
-        avg_incomplete = sum(incomplete_days_screen_time) / len(incomplete_days_screen_time)
-        
-        # Calculate percent difference
-        if avg_incomplete > 0:
-            percent_diff = ((avg_incomplete - avg_completed) / avg_incomplete) * 100
+    correlations = []
+    for result in sorted(significant, key=lambda c: abs(c.r), reverse=True):
+        name = names[result.habit_id]
+        direction = "less" if result.r < 0 else "more"
+        if result.mean_missed > 0:
+            percent_diff = abs(result.mean_missed - result.mean_completed) / result.mean_missed * 100
+            description = f"Days when you complete '{name}' have {int(percent_diff)}% {direction} screen time."
         else:
-            percent_diff = 0
+            description = f"Days when you complete '{name}' have {direction} screen time."
         
-        # Only add significant correlations
-        if abs(percent_diff) > 10:
-            if percent_diff > 0:
-                description = f"Days when you complete '{habit.name}' have {abs(int(percent_diff))}% less screen time."
-            else:
-                description = f"Days when you complete '{habit.name}' have {abs(int(percent_diff))}% more screen time."
-            
-            correlations.append({
-                "title": f"{habit.name} & Screen Time",
-                "description": description,
-                "strength": min(100, abs(int(percent_diff * 1.5)))
-            })
+        correlations.append({
+            "title": f"{name} & Screen Time",
+            "description": description,
+            "strength": int(round(abs(result.r) * 100)),
+            "impact": f"{abs(int(result.mean_completed - result.mean_missed))} minutes {direction} per day "
+                      f"over {result.days} tracked days (r = {result.r:.2f}, p = {result.p_value:.3f})"
+        })
     
-    # If no real correlations found, add a sample one
     if not correlations:
         correlations.append({
             "title": "Habits & Screen Time",
@@ -291,16 +247,16 @@ def generate_personalized_recommendations(habits, screen_time_logs, active_detox
     
     return recommendations
 
-def generate_weekly_report(habits, screen_time_logs):
-    """Generate a weekly AI report"""
+def generate_weekly_report(habits, screen_time_logs, user_id, today):
+    """Generate a weekly AI report from the habit counters, the week's logs and the previous week's rollup"""
     # Calculate overall wellbeing score (0-100)
     habit_score = 0
     screen_time_score = 0
     
     # Calculate habit score
     if habits:
-        completed_habits = sum(1 for h in habits for log in h.logs if log.completed)
-        total_habit_logs = sum(len(h.logs) for h in habits)
+        completed_habits = sum(h.completed_logs for h in habits)
+        total_habit_logs = sum(h.total_logs for h in habits)
         habit_score = (completed_habits / max(1, total_habit_logs)) * 50
     
     # Calculate screen time score
@@ -332,18 +288,15 @@ def generate_weekly_report(habits, screen_time_logs):
     avg_screen_time = int(daily_average)
     
     # Calculate change from previous week
-    two_weeks_ago = datetime.utcnow().date() - timedelta(days=14)
-    one_week_ago = datetime.utcnow().date() - timedelta(days=7)
+    two_weeks_ago = today - timedelta(days=14)
+    one_week_ago = today - timedelta(days=7)
     
-    previous_logs = ScreenTimeLog.query.filter_by(
-        user_id=current_user.id
-    ).filter(
-        ScreenTimeLog.date >= two_weeks_ago,
-        ScreenTimeLog.date < one_week_ago
-    ).all()
-    
-    previous_total = sum(log.usage_minutes for log in previous_logs)
-    previous_daily_avg = previous_total / 7 if previous_logs else 0
+    previous_total = sum(
+        day.screen_minutes for day in UserDailyStats.window(
+            user_id, two_weeks_ago, one_week_ago - timedelta(days=1)
+        )
+    )
+    previous_daily_avg = previous_total / 7
     
     if previous_daily_avg > 0:
         screen_time_change = int(((daily_average - previous_daily_avg) / previous_daily_avg) * 100)
@@ -410,126 +363,115 @@ def generate_weekly_report(habits, screen_time_logs):
         "recommendations": recommendations
     }
 
-@insights.route('/insights')
-@login_required
-def ai_insights():
-    """AI Insights Dashboard"""
+def compute_insights(user_id, today):
+    """Build the insights page bundle: report, correlations, recommendations, score history and at-risk habits.
+    
+    Everything returned is plain data so the bundle can be cached and shared
+    between requests.
+    """
     # Get user's habits
-    user_habits = Habit.query.filter_by(user_id=current_user.id).all()
+    user_habits = Habit.query.filter_by(user_id=user_id).all()
     
     # Get recent screen time logs
-    today = datetime.utcnow().date()
     week_ago = today - timedelta(days=7)
     screen_time_logs = ScreenTimeLog.query.filter_by(
-        user_id=current_user.id
+        user_id=user_id
     ).filter(
         ScreenTimeLog.date >= week_ago
     ).all()
     
-    # Get active and completed detox plans
+    # Get active detox plans
     active_detox_plans = DigitalDetoxPlan.query.filter_by(
-        user_id=current_user.id, 
+        user_id=user_id, 
         is_active=True
     ).all()
     
-    completed_detox_plans = DigitalDetoxPlan.query.filter_by(
-        user_id=current_user.id, 
-        is_active=False
-    ).filter(
-        DigitalDetoxPlan.end_date < today
-    ).all()
-    
     # Get app limits
     app_limits = AppLimit.query.filter_by(
-        user_id=current_user.id
+        user_id=user_id
     ).all()
     
-    # Generate digital wellbeing insights
-    wellbeing_insights = generate_wellbeing_insights(
-        screen_time_logs, 
-        active_detox_plans, 
-        app_limits
-    )
+    # Stored history for visualization, ending with today's score computed
+    # live; snapshots are only written by `flask stats snapshot-scores`
+    score_history = get_wellbeing_score_history(user_id, today=today)
     
-    # Calculate correlations between habits and screen time
-    correlations = calculate_habit_screen_time_correlations(
-        user_habits, 
-        screen_time_logs
-    )
+    # The headline score is today's snapshot, so it matches the end of the chart
+    weekly_report = generate_weekly_report(user_habits, screen_time_logs, user_id, today)
+    weekly_report['overall_score'] = score_history[-1]['score']
     
-    # Generate personalized recommendations
-    recommendations = generate_personalized_recommendations(
-        user_habits, 
-        screen_time_logs, 
-        active_detox_plans, 
-        app_limits
-    )
+    return {
+        'wellbeing_insights': generate_wellbeing_insights(
+            screen_time_logs, active_detox_plans, app_limits, ScreenTimeTrend.slopes(user_id)
+        ),
+        'correlations': calculate_habit_screen_time_correlations(
+            user_habits, user_id, since=today - timedelta(days=CORRELATION_DAYS)
+        ),
+        'recommendations': generate_personalized_recommendations(
+            user_habits, screen_time_logs, active_detox_plans, app_limits
+        ),
+        'weekly_report': weekly_report,
+        'score_history': score_history,
+        'score_dates': [entry['date'].strftime('%Y-%m-%d') for entry in score_history],
+        'score_values': [entry['score'] for entry in score_history],
+        'at_risk_habits': get_at_risk_habits(user_habits, user_id, today)
+    }
+
+def cached_insights(user):
+    """The user's insights bundle, recomputed only when their data version or the day changes"""
+    today = datetime.utcnow().date()
     
-    # Generate weekly report
-    weekly_report = generate_weekly_report(
-        user_habits, 
-        screen_time_logs
-    )
+    def compute():
+        # Bundles for older versions or days can never be hit again
+        insights_cache.discard(lambda key: key[0] == user.id)
+        return compute_insights(user.id, today)
     
-    # Get score history for visualization
-    score_history = get_wellbeing_score_history(current_user.id)
-    score_dates = []
-    score_values = []
-    if score_history:
-        for entry in score_history:
-            score_dates.append(entry['date'].strftime('%Y-%m-%d'))
-            score_values.append(entry['score'])
-    
-    # Get wellbeing score history
-    wellbeing_history = get_wellbeing_score_history(current_user.id)
-    wellbeing_dates = []
-    wellbeing_scores = []
-    if wellbeing_history:
-        for entry in wellbeing_history:
-            wellbeing_dates.append(entry['date'].strftime('%Y-%m-%d'))
-            wellbeing_scores.append(entry['score'])
-    
-    # Get at-risk habits
-    at_risk_habits = get_at_risk_habits(user_habits, screen_time_logs)
-    
-    # Format the report date
-    report_date = today.strftime('%B %d, %Y')
+    return insights_cache.get_or_compute((user.id, user.data_version, today), compute)
+
+@insights.route('/insights')
+@login_required
+def ai_insights():
+    """AI Insights Dashboard"""
+    bundle = cached_insights(current_user)
     
     return render_template(
         'insights/ai_insights.html',
-        weekly_report=weekly_report,
-        correlations=correlations,
-        wellbeing_insights=wellbeing_insights,
-        recommendations=recommendations,
-        score_history=score_history,
-        score_dates=score_dates,
-        score_values=score_values,
-        wellbeing_history=wellbeing_history,
-        wellbeing_dates=wellbeing_dates,
-        wellbeing_scores=wellbeing_scores,
-        at_risk_habits=at_risk_habits,
-        report_date=report_date
+        weekly_report=bundle['weekly_report'],
+        correlations=bundle['correlations'],
+        wellbeing_insights=bundle['wellbeing_insights'],
+        recommendations=bundle['recommendations'],
+        score_history=bundle['score_history'],
+        score_dates=bundle['score_dates'],
+        score_values=bundle['score_values'],
+        wellbeing_history=bundle['score_history'],
+        wellbeing_dates=bundle['score_dates'],
+        wellbeing_scores=bundle['score_values'],
+        at_risk_habits=bundle['at_risk_habits'],
+        report_date=datetime.utcnow().date().strftime('%B %d, %Y')
     )
 
 @insights.route('/insights/api/weekly-report')
 @login_required
 def api_weekly_report():
-    # Get user's habits
-    user_habits = Habit.query.filter_by(user_id=current_user.id).all()
-    
-    # Get recent screen time logs
-    today = datetime.utcnow().date()
-    week_ago = today - timedelta(days=7)
-    screen_time_logs = ScreenTimeLog.query.filter_by(
-        user_id=current_user.id
-    ).filter(
-        ScreenTimeLog.date >= week_ago
-    ).all()
-    
-    # Generate weekly report
-    weekly_report = generate_weekly_report(user_habits, screen_time_logs)
-    
-    return jsonify(weekly_report)
+    return jsonify(cached_insights(current_user)['weekly_report'])
+
+@insights.route('/insights/api/score-history')
+@login_required
+def api_score_history():
+    """Stored daily wellbeing scores for the last ?days= days (default 30)"""
+    days = request.args.get('days', SCORE_HISTORY_DAYS, type=int)
+    if days is None or not 1 <= days <= MAX_SCORE_HISTORY_DAYS:
+        return jsonify({'error': f'days must be between 1 and {MAX_SCORE_HISTORY_DAYS}'}), 400
+    history = get_wellbeing_score_history(current_user.id, days)
+    return jsonify({
+        'dates': [entry['date'].isoformat() for entry in history],
+        'scores': [entry['score'] for entry in history]
+    })
+
+@insights.route('/insights/api/cache-stats')
+@login_required
+def api_cache_stats():
+    """Hit, miss and eviction counters for this process's insight and usage caches"""
+    return jsonify({'insights': insights_cache.stats(), 'usage': usage_cache.stats()})
 
 @insights.route('/insights/api/habit-suggestions')
 @login_required
@@ -555,79 +497,39 @@ def api_habit_suggestions():
 @login_required
 def refresh_insights():
     """Force refresh of AI insights"""
-    # This route simply redirects back to the insights page
-    # The insights will be recalculated when the page loads
+    # Drop the user's cached bundles so the page recomputes them
+    user_id = current_user.id
+    insights_cache.discard(lambda key: key[0] == user_id)
     flash('AI insights have been refreshed with your latest data', 'success')
     return redirect(url_for('insights.ai_insights'))
 
 
-def get_wellbeing_score_history(user_id, days=30):
-    """Get wellbeing score history for the specified user"""
-    # In a real app, this would query a database table
-    # For now, we'll generate some sample data
-    today = datetime.utcnow().date()
-    history = []
-    
-    # Generate sample data with a slight upward trend
-    base_score = 65
-    for i in range(days):
-        date = today - timedelta(days=days-i-1)
-        # Add some randomness to the score
-        random_factor = random.randint(-5, 5)
-        # Add a slight upward trend
-        trend_factor = i * 0.2
-        score = min(100, max(0, base_score + random_factor + trend_factor))
-        history.append({
-            'date': date,
-            'score': int(score)
-        })
-    
+def get_wellbeing_score_history(user_id, days=SCORE_HISTORY_DAYS, today=None):
+    """Daily wellbeing scores for the last days days, oldest first.
+    
+    Past days come from the stored snapshots; today is scored from the
+    rollup without being written.
+    """
+    today = today or datetime.utcnow().date()
+    history = [
+        {'date': day, 'score': score}
+        for day, score in WellbeingScore.history(user_id, today - timedelta(days=days - 1), today - timedelta(days=1))
+    ]
+    current, = WellbeingScore.compute([today], user_ids=[user_id])
+    history.append({'date': today, 'score': current['score']})
     return history
 
 
-def save_wellbeing_score(user_id, score):
-    """Save the current wellbeing score to history"""
-    # In a real app, this would save to a database table
-    # For now, we'll just pass since we're generating sample data
-    pass
-
-
-def get_at_risk_habits(user_habits, screen_time_logs):
+def get_at_risk_habits(user_habits, user_id, today):
     """Identify habits that are at risk of being dropped"""
+    habits_by_id = {h.id: h for h in user_habits}
     at_risk_habits = []
-    
-    for habit in user_habits:
-        # Check completion rate
-        completion_rate = calculate_habit_completion_rate(habit)
-        
-        # Check if screen time is affecting habit completion
-        screen_time_impact = check_screen_time_impact(habit, screen_time_logs)
-        
-        # Determine if habit is at risk
-        if completion_rate < 0.5 or screen_time_impact > 0.7:
-            reason = ""
-            if completion_rate < 0.5:
-                reason = f"Low completion rate ({int(completion_rate*100)}%). Try setting reminders."
-            elif screen_time_impact > 0.7:
-                reason = "High screen time on days when this habit is missed. Consider reducing app usage."
-            
-            at_risk_habits.append({
-                'habit': habit,
-                'reason': reason
-            })
-    
+    for risk in assess_habits(user_id, list(habits_by_id), today):
+        habit = habits_by_id[risk.habit_id]
+        reason = risk.reason
+        if reason is None:
+            predicted, model_reason = predict_habit_dropout(habit)
+            reason = model_reason if predicted else None
+        if reason:
+            at_risk_habits.append({'habit': {'id': habit.id, 'name': habit.name}, 'reason': reason})
     return at_risk_habits
-
-
-def calculate_habit_completion_rate(habit):
-    """Calculate the completion rate for a habit"""
-    # In a real app, this would query the habit's completion records
-    # For now, return a random value between 0.3 and 0.9
-    return random.uniform(0.3, 0.9)
-
-
-def check_screen_time_impact(habit, screen_time_logs):
-    """Check if screen time is impacting habit completion"""
-    # In a real app, this would compare screen time on days when the habit was completed vs missed
-    # For now, return a random value between 0.1 and 0.9
-    return random.uniform(0.1, 0.9)
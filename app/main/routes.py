@@ -1,7 +1,8 @@
 from flask import Blueprint, render_template, redirect, url_for, request, flash
 from flask_login import login_required, current_user
 from app import db
-from app.models import Habit, HabitLog, ScreenTimeLog, Achievement, UserAchievement
+from app.models import Habit, HabitLog, Achievement, UserAchievement, UserDailyStats
+from app.wellbeing.usage import usage_summary
 from datetime import datetime, timedelta
 import os
 import secrets
@@ -47,38 +48,17 @@ def home():
         # Calculate total streak (sum of all habits' current streaks)
         total_streak = sum(habit.current_streak() for habit in habits) if habits else 0
         
-        # Calculate completion rate for the past 7 days
-        past_week_logs = HabitLog.query.filter_by(
-            user_id=current_user.id
-        ).filter(
-            HabitLog.date >= today - timedelta(days=7),
-            HabitLog.date <= today
-        ).all()
-        
-        completion_rate = 0
-        if past_week_logs:
-            completed_logs = sum(1 for log in past_week_logs if log.completed)
-            completion_rate = round((completed_logs / len(past_week_logs)) * 100) if past_week_logs else 0
-        
-        # Get screen time summary
-        screen_time = ScreenTimeLog.query.filter_by(
-            user_id=current_user.id
-        ).filter(
-            ScreenTimeLog.date >= today - timedelta(days=7)
-        ).all()
+        # Calculate completion rate for the past 7 days from the daily rollup
+        past_week_stats = UserDailyStats.window(current_user.id, today - timedelta(days=7))
+        logged = sum(day.habits_logged for day in past_week_stats if day.date <= today)
+        completed_logs = sum(day.habits_completed for day in past_week_stats if day.date <= today)
+        completion_rate = round((completed_logs / logged) * 100) if logged else 0
         
         # Get total screen time
-        total_screen_time = sum(log.usage_minutes for log in screen_time)
+        total_screen_time = sum(day.screen_minutes for day in past_week_stats)
         
         # Get top apps
-        app_usage = {}
-        for log in screen_time:
-            if log.app_name in app_usage:
-                app_usage[log.app_name] += log.usage_minutes
-            else:
-                app_usage[log.app_name] = log.usage_minutes
-        
-        top_apps = sorted(app_usage.items(), key=lambda x: x[1], reverse=True)[:5]
+        top_apps = usage_summary(current_user.id, since=today - timedelta(days=7)).app_totals[:5]
         
         # Get recent achievements
         achievements = UserAchievement.query.filter_by(
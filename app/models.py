@@ -1,4 +1,6 @@
-from datetime import datetime
+import hashlib
+import secrets
+from datetime import datetime, timedelta
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from app import db
@@ -14,6 +16,8 @@ class User(db.Model, UserMixin):
     bio = db.Column(db.Text)
     profile_pic = db.Column(db.String(100), default='default.jpg')
     join_date = db.Column(db.DateTime, default=datetime.utcnow)
+    api_token_hash = db.Column(db.String(64), unique=True, index=True)  # SHA-256 of the device API token
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Bumped whenever insight inputs change
     
     # Relationships
     habits = db.relationship('Habit', backref='user', lazy=True)
@@ -29,6 +33,32 @@ class User(db.Model, UserMixin):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
     
+    def generate_api_token(self):
+        """Issue a new device API token, replacing any previous one.
+        
+        Only a hash is stored, so the returned token cannot be shown again.
+        """
+        token = secrets.token_urlsafe(32)
+        self.api_token_hash = hashlib.sha256(token.encode()).hexdigest()
+        return token
+    
+    @classmethod
+    def bump_data_version(cls, *user_ids):
+        """Mark users' habits, logs, limits or plans as changed so cached insights are recomputed.
+        
+        Increments in SQL so concurrent writers never lose a bump; the caller commits.
+        """
+        if user_ids:
+            db.session.execute(
+                db.update(cls).where(cls.id.in_(user_ids)).values(data_version=cls.data_version + 1)
+            )
+    
+    @staticmethod
+    def from_api_token(token):
+        if not token:
+            return None
+        return User.query.filter_by(api_token_hash=hashlib.sha256(token.encode()).hexdigest()).first()
+    
     def __repr__(self):
         return f'<User {self.username}>'
 
@@ -41,34 +71,82 @@ class Habit(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     
+    # Stored counters, kept current by record_log() on every HabitLog write
+    current_streak_days = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    longest_streak_days = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_completed_date = db.Column(db.Date)
+    total_logs = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    completed_logs = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
+    # Written by the nightly `flask habits score-dropout` job; None until scored
+    dropout_risk = db.Column(db.Float)  # Predicted probability of no completion in the next two weeks
+    dropout_scored_on = db.Column(db.Date)
+    
     # Relationships
     logs = db.relationship('HabitLog', backref='habit', lazy=True)
     
     def current_streak(self):
-        # Calculate current streak
-        logs = HabitLog.query.filter_by(habit_id=self.id, completed=True).order_by(HabitLog.date.desc()).all()
-        if not logs:
-            return 0
-            
-        streak = 1
-        for i in range(len(logs) - 1):
-            if (logs[i].date - logs[i+1].date).days == 1:
-                streak += 1
-            else:
-                break
-        return streak
+        return self.current_streak_days or 0
     
     def completion_rate(self):
-        total_logs = HabitLog.query.filter_by(habit_id=self.id).count()
-        if total_logs == 0:
+        if not self.total_logs:
             return 0
-        completed_logs = HabitLog.query.filter_by(habit_id=self.id, completed=True).count()
-        return (completed_logs / total_logs) * 100
+        return (self.completed_logs / self.total_logs) * 100
+    
+    def record_log(self, log_date, completed, was_completed=None):
+        """Update the stored counters for a log written on log_date.
+        
+        was_completed is the log's previous completed flag, or None for a new
+        log. Call this in the same transaction as the HabitLog write.
+        """
+        completed = bool(completed)
+        if was_completed is None:
+            self.total_logs = (self.total_logs or 0) + 1
+        elif bool(was_completed) == completed:
+            return
+        
+        if completed:
+            self.completed_logs = (self.completed_logs or 0) + 1
+        elif was_completed:
+            self.completed_logs = (self.completed_logs or 0) - 1
+        
+        if not completed and was_completed is None:
+            return
+        
+        if completed and (self.last_completed_date is None or log_date > self.last_completed_date):
+            # Extending or restarting the streak only depends on the last completion
+            if self.last_completed_date == log_date - timedelta(days=1):
+                self.current_streak_days = (self.current_streak_days or 0) + 1
+            else:
+                self.current_streak_days = 1
+            self.last_completed_date = log_date
+            self.longest_streak_days = max(self.longest_streak_days or 0, self.current_streak_days)
+        else:
+            # Backdated completions and un-completions can split or join runs
+            self.refresh_streaks()
+    
+    def refresh_streaks(self):
+        """Re-derive the stored streak counters from this habit's logs"""
+        from app.habits.streaks import calculate_streaks
+        db.session.flush()
+        streak = calculate_streaks(habit_ids=[self.id])[self.id]
+        self.current_streak_days = streak.current
+        self.longest_streak_days = streak.longest
+        self.last_completed_date = db.session.query(db.func.max(HabitLog.date)).filter(
+            HabitLog.habit_id == self.id,
+            HabitLog.completed == True
+        ).scalar()
     
     def __repr__(self):
         return f'<Habit {self.name}>'
 
 class HabitLog(db.Model):
+    __table_args__ = (
+        # Covering indexes for per-user and per-habit date windows
+        db.Index('ix_habit_log_user_id_date', 'user_id', 'date', 'completed'),
+        db.Index('ix_habit_log_habit_id_date', 'habit_id', 'date', 'completed'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.Date, nullable=False, default=datetime.utcnow().date)
     completed = db.Column(db.Boolean, default=False)
@@ -80,18 +158,199 @@ class HabitLog(db.Model):
         return f'<HabitLog {self.habit_id} on {self.date}>'
 
 class ScreenTimeLog(db.Model):
+    __table_args__ = (
+        # Serves the newest-first (date, id) keyset pages of a user's raw logs
+        db.Index('ix_screen_time_log_user_id_date_id', 'user_id', 'date', 'id'),
+        # One row per app per day; re-imports upsert instead of duplicating. Its
+        # index also serves the per-user date window queries
+        db.UniqueConstraint('user_id', 'date', 'app_name', name='uq_screen_time_log_user_id_date_app_name'),
+    )
+    
+    UPSERT_MODES = ('replace', 'sum')
+    
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.Date, nullable=False)
     app_name = db.Column(db.String(100), nullable=False)
     usage_minutes = db.Column(db.Integer, nullable=False)
-    upload_file = db.Column(db.String(100))  # Reference to the uploaded file
-    uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
+    upload_id = db.Column(db.Integer, db.ForeignKey('screen_time_upload.id'))  # Upload that last wrote the row
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     
     def __repr__(self):
         return f'<ScreenTimeLog {self.app_name} - {self.usage_minutes} mins>'
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'date': self.date.isoformat(),
+            'app_name': self.app_name,
+            'usage_minutes': self.usage_minutes
+        }
+    
+    @classmethod
+    def page(cls, user_id, before=None, limit=50):
+        """One page of a user's logs, newest first, keyset-paginated on (date, id).
+        
+        before is the (date, id) key of the last row on the previous page.
+        Returns (rows, next_key), where next_key is None on the last page.
+        """
+        query = cls.query.filter(cls.user_id == user_id)
+        if before is not None:
+            before_date, before_id = before
+            query = query.filter(db.or_(
+                cls.date < before_date,
+                db.and_(cls.date == before_date, cls.id < before_id)
+            ))
+        rows = query.order_by(cls.date.desc(), cls.id.desc()).limit(limit + 1).all()
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, (rows[-1].date, rows[-1].id)
+    
+    @classmethod
+    def upsert(cls, rows, mode='replace', batch_size=5000):
+        """Insert log rows, merging any that collide on (user_id, date, app_name).
+        
+        mode='replace' keeps the incoming usage_minutes and skips the write when
+        it is unchanged; mode='sum' adds it to the stored value. Rows must not
+        repeat a key within one call. The caller commits.
+        """
+        if mode not in cls.UPSERT_MODES:
+            raise ValueError(f"Unknown screen time upsert mode: {mode}")
+        
+        dialect = db.session.get_bind().dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            return cls._upsert_portable(rows, mode, batch_size)
+        
+        table = cls.__table__
+        stmt = insert(table)
+        if mode == 'sum':
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['user_id', 'date', 'app_name'],
+                set_={
+                    'usage_minutes': table.c.usage_minutes + stmt.excluded.usage_minutes,
+                    'upload_id': stmt.excluded.upload_id
+                }
+            )
+        else:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['user_id', 'date', 'app_name'],
+                set_={
+                    'usage_minutes': stmt.excluded.usage_minutes,
+                    'upload_id': stmt.excluded.upload_id
+                },
+                where=table.c.usage_minutes != stmt.excluded.usage_minutes
+            )
+        
+        for start in range(0, len(rows), batch_size):
+            db.session.execute(stmt, rows[start:start + batch_size])
+        return len(rows)
+    
+    @classmethod
+    def _upsert_portable(cls, rows, mode, batch_size):
+        """upsert for databases without INSERT ... ON CONFLICT.
+        
+        Each batch selects the keys it already has, then updates those rows and
+        inserts the rest in two executemany statements.
+        """
+        table = cls.__table__
+        update = table.update().where(table.c.id == db.bindparam('existing_id')).values(
+            usage_minutes=db.bindparam('new_minutes'),
+            upload_id=db.bindparam('new_upload_id')
+        )
+        
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            existing = {
+                (user_id, day, app_name): (log_id, minutes)
+                for log_id, user_id, day, app_name, minutes in db.session.execute(
+                    db.select(table.c.id, table.c.user_id, table.c.date, table.c.app_name, table.c.usage_minutes)
+                    .where(table.c.user_id.in_({row['user_id'] for row in batch}))
+                    .where(table.c.date.in_({row['date'] for row in batch}))
+                    .where(table.c.app_name.in_({row['app_name'] for row in batch}))
+                )
+            }
+            
+            inserts = []
+            updates = []
+            for row in batch:
+                match = existing.get((row['user_id'], row['date'], row['app_name']))
+                if match is None:
+                    inserts.append(row)
+                    continue
+                log_id, minutes = match
+                new_minutes = minutes + row['usage_minutes'] if mode == 'sum' else row['usage_minutes']
+                if mode == 'sum' or new_minutes != minutes:
+                    updates.append({
+                        'existing_id': log_id,
+                        'new_minutes': new_minutes,
+                        'new_upload_id': row['upload_id']
+                    })
+            
+            if updates:
+                db.session.execute(update, updates)
+            if inserts:
+                db.session.execute(table.insert(), inserts)
+        return len(rows)
 
 
+class ScreenTimeUpload(db.Model):
+    """An uploaded screen time file, its background import and its stats"""
+    __table_args__ = (
+        # Upload history is read newest first per user
+        db.Index('ix_screen_time_upload_user_id_created_at', 'user_id', 'created_at'),
+    )
+    
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(100), nullable=False)  # Name of the stored file
+    original_filename = db.Column(db.String(255))
+    content_hash = db.Column(db.String(64), index=True)  # SHA-256 of the uploaded file
+    byte_size = db.Column(db.Integer)
+    status = db.Column(db.String(20), nullable=False, default=QUEUED)
+    row_count = db.Column(db.Integer, nullable=False, default=0)  # Rows imported so far
+    rejected_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    error_report = db.Column(db.JSON)  # [{'row': n, 'errors': [...]}] for the first rejected rows
+    first_date = db.Column(db.Date)
+    last_date = db.Column(db.Date)
+    import_seconds = db.Column(db.Float)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    
+    # Relationships
+    logs = db.relationship('ScreenTimeLog', backref='upload', lazy=True)
+    
+    @property
+    def is_finished(self):
+        return self.status in (self.COMPLETED, self.FAILED)
+    
+    def to_dict(self):
+        """Progress fields reported to the upload page"""
+        return {
+            'id': self.id,
+            'status': self.status,
+            'row_count': self.row_count,
+            'rejected_count': self.rejected_count,
+            'error_report': self.error_report or [],
+            'error': self.error,
+            'finished': self.is_finished,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+    
+    def __repr__(self):
+        return f'<ScreenTimeUpload {self.filename} - {self.status}>'
+
 class ScreenTime(db.Model):
     """Aggregated screen time data for a user"""
     id = db.Column(db.Integer, primary_key=True)
@@ -105,70 +364,399 @@ class ScreenTime(db.Model):
         return f'<ScreenTime {self.date} - {self.daily_average} mins>'
     
     @classmethod
-    def generate_from_logs(cls, user_id):
-        """Generate aggregated screen time data from logs"""
-        from datetime import datetime, timedelta
-        import sqlalchemy as sa
+    def _summarize_logs(cls, today, user_ids=None):
+        """Aggregate two weeks of ScreenTimeLog rows with GROUP BY queries.
         
-        # Get today's date and 7 days ago
-        today = datetime.utcnow().date()
+        Returns {user_id: (daily_average, most_used_app, weekly_change)} for
+        every user (or just user_ids) with logs in the current week.
+        """
+        # The current week is the 7 days before today plus today itself
         week_ago = today - timedelta(days=7)
         two_weeks_ago = today - timedelta(days=14)
+        is_current_week = db.case((ScreenTimeLog.date >= week_ago, True), else_=False)
         
-        # Get logs from the past week
-        current_week_logs = ScreenTimeLog.query.filter(
-            ScreenTimeLog.user_id == user_id,
-            ScreenTimeLog.date >= week_ago,
-            ScreenTimeLog.date <= today
-        ).all()
-        
-        # Get logs from the previous week for comparison
-        previous_week_logs = ScreenTimeLog.query.filter(
-            ScreenTimeLog.user_id == user_id,
+        # Totals and distinct-day counts for both weeks in one query
+        week_totals = db.session.query(
+            ScreenTimeLog.user_id,
+            is_current_week,
+            db.func.sum(ScreenTimeLog.usage_minutes),
+            db.func.count(db.distinct(ScreenTimeLog.date))
+        ).filter(
             ScreenTimeLog.date >= two_weeks_ago,
-            ScreenTimeLog.date < week_ago
-        ).all()
+            ScreenTimeLog.date <= today
+        ).group_by(ScreenTimeLog.user_id, is_current_week)
         
-        # If no logs, return None
-        if not current_week_logs:
-            return None
+        # Per-app totals for the current week
+        app_totals = db.session.query(
+            ScreenTimeLog.user_id,
+            ScreenTimeLog.app_name,
+            db.func.sum(ScreenTimeLog.usage_minutes)
+        ).filter(
+            ScreenTimeLog.date >= week_ago,
+            ScreenTimeLog.date <= today
+        ).group_by(ScreenTimeLog.user_id, ScreenTimeLog.app_name)
         
-        # Calculate daily average
-        total_minutes = sum(log.usage_minutes for log in current_week_logs)
-        # Get unique dates to know how many days of data we have
-        unique_dates = set(log.date for log in current_week_logs)
-        daily_average = total_minutes // len(unique_dates) if unique_dates else 0
+        if user_ids is not None:
+            week_totals = week_totals.filter(ScreenTimeLog.user_id.in_(user_ids))
+            app_totals = app_totals.filter(ScreenTimeLog.user_id.in_(user_ids))
         
-        # Find most used app
-        app_usage = {}
-        for log in current_week_logs:
-            app_usage[log.app_name] = app_usage.get(log.app_name, 0) + log.usage_minutes
+        averages = {}
+        for row_user_id, current_week, total, days in week_totals:
+            averages[(row_user_id, bool(current_week))] = total // days if days else 0
         
-        most_used_app = max(app_usage.items(), key=lambda x: x[1])[0] if app_usage else 'None'
+        most_used = {}
+        for row_user_id, app_name, total in app_totals:
+            if row_user_id not in most_used or total > most_used[row_user_id][1]:
+                most_used[row_user_id] = (app_name, total)
         
-        # Calculate weekly change percentage
-        previous_total = sum(log.usage_minutes for log in previous_week_logs)
-        previous_unique_dates = set(log.date for log in previous_week_logs)
-        previous_daily_avg = previous_total // len(previous_unique_dates) if previous_unique_dates else 0
+        summaries = {}
+        for (row_user_id, current_week), daily_average in averages.items():
+            if not current_week:
+                continue
+            previous_daily_avg = averages.get((row_user_id, False), 0)
+            if previous_daily_avg > 0:
+                weekly_change = ((daily_average - previous_daily_avg) / previous_daily_avg) * 100
+            else:
+                weekly_change = 0
+            most_used_app = most_used[row_user_id][0] if row_user_id in most_used else 'None'
+            summaries[row_user_id] = (daily_average, most_used_app, int(weekly_change))
+        return summaries
+    
+    @classmethod
+    def generate_from_logs(cls, user_id):
+        """Generate aggregated screen time data from logs"""
+        today = datetime.utcnow().date()
+        summary = cls._summarize_logs(today, user_ids=[user_id]).get(user_id)
         
-        if previous_daily_avg > 0:
-            weekly_change = ((daily_average - previous_daily_avg) / previous_daily_avg) * 100
-        else:
-            weekly_change = 0
+        # If no logs, return None
+        if summary is None:
+            return None
+        daily_average, most_used_app, weekly_change = summary
         
         # Create or update ScreenTime record
         screen_time = cls.query.filter_by(user_id=user_id, date=today).first()
         if not screen_time:
             screen_time = cls(user_id=user_id, date=today, daily_average=daily_average,
-                             most_used_app=most_used_app, weekly_change=int(weekly_change))
+                             most_used_app=most_used_app, weekly_change=weekly_change)
             db.session.add(screen_time)
         else:
             screen_time.daily_average = daily_average
             screen_time.most_used_app = most_used_app
-            screen_time.weekly_change = int(weekly_change)
+            screen_time.weekly_change = weekly_change
         
         db.session.commit()
         return screen_time
+    
+    @classmethod
+    def generate_for_users(cls, user_ids=None):
+        """Refresh today's ScreenTime row for many users in one pass.
+        
+        Covers every user with screen time logs this week, or only the given
+        user_ids. Returns the number of rows written.
+        """
+        today = datetime.utcnow().date()
+        summaries = cls._summarize_logs(today, user_ids=list(user_ids) if user_ids is not None else None)
+        if not summaries:
+            return 0
+        
+        existing = {row.user_id: row for row in cls.query.filter(cls.date == today)}
+        for uid, (daily_average, most_used_app, weekly_change) in summaries.items():
+            screen_time = existing.get(uid)
+            if not screen_time:
+                screen_time = cls(user_id=uid, date=today)
+                db.session.add(screen_time)
+            screen_time.daily_average = daily_average
+            screen_time.most_used_app = most_used_app
+            screen_time.weekly_change = weekly_change
+        
+        db.session.commit()
+        return len(summaries)
+
+class UserDailyStats(db.Model):
+    """Per-user daily rollup of habit logs and screen time"""
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'date', name='uq_user_daily_stats_user_id_date'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    habits_logged = db.Column(db.Integer, nullable=False, default=0)
+    habits_completed = db.Column(db.Integer, nullable=False, default=0)
+    screen_minutes = db.Column(db.Integer, nullable=False, default=0)
+    top_app = db.Column(db.String(100))  # None when no screen time was logged that day
+    top_app_minutes = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<UserDailyStats {self.user_id} on {self.date}>'
+    
+    @classmethod
+    def window(cls, user_id, start, end=None):
+        """Rollup rows for a user between start and end (inclusive), oldest first"""
+        query = cls.query.filter(cls.user_id == user_id, cls.date >= start)
+        if end is not None:
+            query = query.filter(cls.date <= end)
+        return query.order_by(cls.date).all()
+    
+    @classmethod
+    def _rows_for(cls, user_id, dates):
+        """Existing rows for the given dates, creating any that are missing"""
+        rows = {
+            row.date: row for row in cls.query.filter(
+                cls.user_id == user_id,
+                cls.date >= min(dates),
+                cls.date <= max(dates)
+            )
+        }
+        for day in dates:
+            if day not in rows:
+                rows[day] = cls(user_id=user_id, date=day, habits_logged=0, habits_completed=0,
+                                screen_minutes=0, top_app_minutes=0)
+                db.session.add(rows[day])
+        return rows
+    
+    @classmethod
+    def refresh_habits(cls, user_id, dates):
+        """Recompute the habit columns for the given dates. The caller commits."""
+        dates = set(dates)
+        if not dates:
+            return
+        
+        totals = {
+            day: (logged, completed or 0) for day, logged, completed in db.session.query(
+                HabitLog.date,
+                db.func.count(HabitLog.id),
+                db.func.sum(db.case((HabitLog.completed == True, 1), else_=0))
+            ).filter(
+                HabitLog.user_id == user_id,
+                HabitLog.date >= min(dates),
+                HabitLog.date <= max(dates)
+            ).group_by(HabitLog.date)
+        }
+        
+        for day, row in cls._rows_for(user_id, dates).items():
+            if day in dates:
+                row.habits_logged, row.habits_completed = totals.get(day, (0, 0))
+    
+    @classmethod
+    def refresh_screen_time(cls, user_id, dates):
+        """Recompute the screen time columns for the given dates. The caller commits."""
+        dates = set(dates)
+        if not dates:
+            return
+        
+        totals = {}
+        for day, app_name, minutes in db.session.query(
+            ScreenTimeLog.date,
+            ScreenTimeLog.app_name,
+            db.func.sum(ScreenTimeLog.usage_minutes)
+        ).filter(
+            ScreenTimeLog.user_id == user_id,
+            ScreenTimeLog.date >= min(dates),
+            ScreenTimeLog.date <= max(dates)
+        ).group_by(ScreenTimeLog.date, ScreenTimeLog.app_name):
+            total, top_app, top_minutes = totals.get(day, (0, None, -1))
+            if minutes > top_minutes:
+                top_app, top_minutes = app_name, minutes
+            totals[day] = (total + minutes, top_app, top_minutes)
+        
+        changes = {}
+        for day, row in cls._rows_for(user_id, dates).items():
+            if day in dates:
+                total, top_app, top_minutes = totals.get(day, (0, None, 0))
+                changes[day] = (
+                    row.screen_minutes if row.top_app is not None else None,
+                    total if top_app is not None else None
+                )
+                row.screen_minutes = total
+                row.top_app = top_app
+                row.top_app_minutes = top_minutes
+        ScreenTimeTrend.apply(user_id, changes)
+    
+    @classmethod
+    def backfill(cls, user_id=None, batch_size=5000):
+        """Rebuild the rollup from log history for one user or everyone.
+        
+        Returns the number of rows written. The caller commits.
+        """
+        habit_query = db.session.query(
+            HabitLog.user_id,
+            HabitLog.date,
+            db.func.count(HabitLog.id),
+            db.func.sum(db.case((HabitLog.completed == True, 1), else_=0))
+        ).group_by(HabitLog.user_id, HabitLog.date)
+        screen_query = db.session.query(
+            ScreenTimeLog.user_id,
+            ScreenTimeLog.date,
+            ScreenTimeLog.app_name,
+            db.func.sum(ScreenTimeLog.usage_minutes)
+        ).group_by(ScreenTimeLog.user_id, ScreenTimeLog.date, ScreenTimeLog.app_name)
+        delete_query = cls.query
+        if user_id is not None:
+            habit_query = habit_query.filter(HabitLog.user_id == user_id)
+            screen_query = screen_query.filter(ScreenTimeLog.user_id == user_id)
+            delete_query = delete_query.filter(cls.user_id == user_id)
+        
+        rows = {}
+        
+        def row_for(row_user_id, day):
+            key = (row_user_id, day)
+            if key not in rows:
+                rows[key] = {'user_id': row_user_id, 'date': day, 'habits_logged': 0, 'habits_completed': 0,
+                             'screen_minutes': 0, 'top_app': None, 'top_app_minutes': 0}
+            return rows[key]
+        
+        for row_user_id, day, logged, completed in habit_query:
+            row = row_for(row_user_id, day)
+            row['habits_logged'] = logged
+            row['habits_completed'] = completed or 0
+        
+        for row_user_id, day, app_name, minutes in screen_query:
+            row = row_for(row_user_id, day)
+            row['screen_minutes'] += minutes
+            if row['top_app'] is None or minutes > row['top_app_minutes']:
+                row['top_app'] = app_name
+                row['top_app_minutes'] = minutes
+        
+        delete_query.delete(synchronize_session=False)
+        values = list(rows.values())
+        for start in range(0, len(values), batch_size):
+            db.session.execute(db.insert(cls), values[start:start + batch_size])
+        return len(values)
+
+class ScreenTimeTrend(db.Model):
+    """Running least-squares sums of a user's daily screen minutes over a trailing window.
+    
+    x is the day number and y that day's total minutes, for tracked days in
+    the window_days ending on through (the latest tracked day). The sums are
+    kept current by UserDailyStats.refresh_screen_time, so slopes are O(1)
+    reads. Rebuild with `flask stats backfill`.
+    """
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'window_days', name='uq_screen_time_trend_user_id_window_days'),
+    )
+    
+    WINDOWS = (7, 30, 90)
+    EPOCH = datetime(2000, 1, 1).date()  # Day 0, keeping the sums small and exact
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    window_days = db.Column(db.Integer, nullable=False)
+    through = db.Column(db.Date)
+    n = db.Column(db.Integer, nullable=False, default=0)
+    sum_x = db.Column(db.Float, nullable=False, default=0)
+    sum_y = db.Column(db.Float, nullable=False, default=0)
+    sum_xy = db.Column(db.Float, nullable=False, default=0)
+    sum_xx = db.Column(db.Float, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<ScreenTimeTrend {self.user_id} over {self.window_days} days through {self.through}>'
+    
+    @property
+    def slope(self):
+        """Least-squares change in daily screen minutes per day, or None with fewer than 3 days"""
+        denominator = self.n * self.sum_xx - self.sum_x ** 2
+        if self.n < 3 or denominator <= 0:
+            return None
+        return (self.n * self.sum_xy - self.sum_x * self.sum_y) / denominator
+    
+    def _add(self, day, minutes, sign=1):
+        x = (day - self.EPOCH).days
+        self.n += sign
+        self.sum_x += sign * x
+        self.sum_y += sign * minutes
+        self.sum_xy += sign * x * minutes
+        self.sum_xx += sign * x * x
+    
+    @classmethod
+    def _rows_for(cls, user_id):
+        rows = {row.window_days: row for row in cls.query.filter_by(user_id=user_id)}
+        for window in cls.WINDOWS:
+            if window not in rows:
+                rows[window] = cls(user_id=user_id, window_days=window, n=0,
+                                   sum_x=0, sum_y=0, sum_xy=0, sum_xx=0)
+                db.session.add(rows[window])
+        return rows
+    
+    @classmethod
+    def apply(cls, user_id, changes):
+        """Fold changed rollup days into each window's sums.
+        
+        changes maps day -> (old minutes, new minutes), None meaning untracked.
+        Changed days inside a window are swapped in place; when a newer day
+        arrives the window slides forward, subtracting only the days that
+        leave it. The caller commits.
+        """
+        changes = {day: change for day, change in changes.items() if change[0] != change[1]}
+        if not changes:
+            return
+        
+        tracked = [day for day, (_, new) in changes.items() if new is not None]
+        for window, row in cls._rows_for(user_id).items():
+            through = max(tracked + ([row.through] if row.through else []), default=None)
+            if through is None:
+                continue
+            
+            if row.through is not None:
+                start = row.through - timedelta(days=window - 1)
+                for day, (old, _) in changes.items():
+                    if old is not None and start <= day <= row.through:
+                        row._add(day, old, -1)
+                
+                # Unchanged days that slide out of the window
+                if through > row.through:
+                    leaving = db.session.query(UserDailyStats.date, UserDailyStats.screen_minutes).filter(
+                        UserDailyStats.user_id == user_id,
+                        UserDailyStats.top_app.isnot(None),
+                        UserDailyStats.date >= start,
+                        UserDailyStats.date <= min(row.through, through - timedelta(days=window))
+                    )
+                    for day, minutes in leaving:
+                        if day not in changes:
+                            row._add(day, minutes, -1)
+            
+            start = through - timedelta(days=window - 1)
+            for day, (_, new) in changes.items():
+                if new is not None and start <= day <= through:
+                    row._add(day, new)
+            row.through = through
+    
+    @classmethod
+    def rebuild(cls, user_id=None):
+        """Recompute every window's sums from the rollup for one user or everyone.
+        
+        Returns the number of users rebuilt. The caller commits.
+        """
+        latest = db.session.query(UserDailyStats.user_id, db.func.max(UserDailyStats.date)).filter(
+            UserDailyStats.top_app.isnot(None)
+        ).group_by(UserDailyStats.user_id)
+        stale = cls.query
+        if user_id is not None:
+            latest = latest.filter(UserDailyStats.user_id == user_id)
+            stale = stale.filter(cls.user_id == user_id)
+        latest = latest.all()
+        stale.delete(synchronize_session=False)
+        
+        for row_user_id, through in latest:
+            days = db.session.query(UserDailyStats.date, UserDailyStats.screen_minutes).filter(
+                UserDailyStats.user_id == row_user_id,
+                UserDailyStats.top_app.isnot(None),
+                UserDailyStats.date > through - timedelta(days=max(cls.WINDOWS))
+            ).all()
+            for window, row in cls._rows_for(row_user_id).items():
+                row.through = through
+                for day, minutes in days:
+                    if day > through - timedelta(days=window):
+                        row._add(day, minutes)
+        return len(latest)
+    
+    @classmethod
+    def slopes(cls, user_id):
+        """{window_days: slope or None} for each supported window"""
+        slopes = dict.fromkeys(cls.WINDOWS)
+        for row in cls.query.filter_by(user_id=user_id):
+            slopes[row.window_days] = row.slope
+        return slopes
 
 class AppLimit(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -178,9 +766,100 @@ class AppLimit(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     
+    statuses = db.relationship('AppLimitStatus', backref='app_limit', lazy=True, cascade='all, delete-orphan')
+    
     def __repr__(self):
         return f'<AppLimit {self.app_name} - {self.daily_limit_minutes} mins>'
 
+class AppLimitStatus(db.Model):
+    """One active AppLimit evaluated against one day's usage of its app"""
+    __table_args__ = (
+        db.UniqueConstraint('app_limit_id', 'date', name='uq_app_limit_status_app_limit_id_date'),
+        # Serves the per-user day listings and violation history
+        db.Index('ix_app_limit_status_user_id_date', 'user_id', 'date'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, nullable=False)
+    usage_minutes = db.Column(db.Integer, nullable=False)
+    limit_minutes = db.Column(db.Integer, nullable=False)  # The limit when evaluated
+    headroom_minutes = db.Column(db.Integer, nullable=False)  # Negative when the limit was exceeded
+    app_limit_id = db.Column(db.Integer, db.ForeignKey('app_limit.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    
+    def __repr__(self):
+        return f'<AppLimitStatus {self.app_limit_id} on {self.date}: {self.headroom_minutes} mins left>'
+    
+    @property
+    def exceeded(self):
+        return self.headroom_minutes < 0
+    
+    @classmethod
+    def evaluate(cls, dates, user_ids=None, batch_size=5000):
+        """Re-evaluate every active limit on the given dates, for everyone or just user_ids.
+        
+        Limits are matched against that day's ScreenTimeLog row for their app
+        in a single join; days before a limit was created are not judged
+        against it. Existing statuses for those users and dates are replaced,
+        so inactive limits drop out. Returns the number of rows written. The
+        caller commits.
+        """
+        dates = set(dates)
+        if not dates or (user_ids is not None and not user_ids):
+            return 0
+        
+        limits = db.session.query(
+            AppLimit.id, AppLimit.user_id, AppLimit.daily_limit_minutes, AppLimit.created_at
+        ).filter(AppLimit.is_active == True)
+        usage = db.session.query(
+            AppLimit.id, ScreenTimeLog.date, ScreenTimeLog.usage_minutes
+        ).join(ScreenTimeLog, db.and_(
+            ScreenTimeLog.user_id == AppLimit.user_id,
+            ScreenTimeLog.app_name == AppLimit.app_name
+        )).filter(
+            AppLimit.is_active == True,
+            ScreenTimeLog.date >= min(dates),
+            ScreenTimeLog.date <= max(dates)
+        )
+        stale = db.delete(cls).where(cls.date.in_(dates))
+        if user_ids is not None:
+            user_ids = list(user_ids)
+            limits = limits.filter(AppLimit.user_id.in_(user_ids))
+            usage = usage.filter(AppLimit.user_id.in_(user_ids))
+            stale = stale.where(cls.user_id.in_(user_ids))
+        
+        used = {(limit_id, day): minutes for limit_id, day, minutes in usage}
+        values = []
+        for limit_id, user_id, limit_minutes, created_at in limits:
+            first_day = created_at.date() if created_at else min(dates)
+            for day in dates:
+                if day < first_day:
+                    continue
+                minutes = used.get((limit_id, day), 0)
+                values.append({
+                    'date': day,
+                    'usage_minutes': minutes,
+                    'limit_minutes': limit_minutes,
+                    'headroom_minutes': limit_minutes - minutes,
+                    'app_limit_id': limit_id,
+                    'user_id': user_id
+                })
+        
+        db.session.execute(stale)
+        for start in range(0, len(values), batch_size):
+            db.session.execute(db.insert(cls), values[start:start + batch_size])
+        return len(values)
+    
+    @classmethod
+    def for_day(cls, user_id, day):
+        """(limit, status) for each of a user's active limits on day; status is None if not yet evaluated"""
+        return db.session.query(AppLimit, cls).outerjoin(
+            cls, db.and_(cls.app_limit_id == AppLimit.id, cls.date == day)
+        ).filter(
+            AppLimit.user_id == user_id,
+            AppLimit.is_active == True
+        ).order_by(AppLimit.app_name).all()
+
 class DigitalDetoxPlan(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     daily_limit_minutes = db.Column(db.Integer, nullable=False)
@@ -196,8 +875,183 @@ class DigitalDetoxPlan(db.Model):
     enable_break_reminders = db.Column(db.Boolean, default=True)
     break_interval_minutes = db.Column(db.Integer, default=60)  # Remind every 60 minutes by default
     
+    # Adherence over the days with screen time data since start_date, folded
+    # in from UserDailyStats as data lands; days without data are skipped
+    days_tracked = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    days_under_limit = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    current_streak = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    best_streak = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    minutes_saved = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    progress_through = db.Column(db.Date, nullable=True)  # Last day folded into the counters
+    
+    # Compliant days in a row that complete a plan
+    GOAL_STREAK_DAYS = 7
+    
     def __repr__(self):
         return f'<DigitalDetoxPlan {self.id} - {self.daily_limit_minutes} mins>'
+    
+    @property
+    def is_completed(self):
+        return self.best_streak >= self.GOAL_STREAK_DAYS
+    
+    def _tracked_days(self, after=None):
+        """(date, screen_minutes) for rollup days with screen time in the plan, oldest first"""
+        query = db.session.query(UserDailyStats.date, UserDailyStats.screen_minutes).filter(
+            UserDailyStats.user_id == self.user_id,
+            UserDailyStats.date >= self.start_date,
+            UserDailyStats.top_app.isnot(None)
+        )
+        if after is not None:
+            query = query.filter(UserDailyStats.date > after)
+        if self.end_date is not None:
+            query = query.filter(UserDailyStats.date <= self.end_date)
+        return query.order_by(UserDailyStats.date)
+    
+    def _fold(self, days):
+        for day, minutes in days:
+            self.days_tracked += 1
+            if minutes <= self.daily_limit_minutes:
+                self.days_under_limit += 1
+                self.current_streak += 1
+                self.best_streak = max(self.best_streak, self.current_streak)
+                self.minutes_saved += self.daily_limit_minutes - minutes
+            else:
+                self.current_streak = 0
+            self.progress_through = day
+    
+    def rebuild_progress(self):
+        """Recompute the progress counters from the plan's whole span. The caller commits."""
+        self.days_tracked = self.days_under_limit = 0
+        self.current_streak = self.best_streak = self.minutes_saved = 0
+        self.progress_through = None
+        self._fold(self._tracked_days())
+    
+    @classmethod
+    def refresh_progress(cls, user_id, dates):
+        """Update the plans covering dates after their rollup days changed.
+        
+        Days after a plan's progress_through are folded onto its counters;
+        if an already counted day changed, the plan is rebuilt from the
+        rollup instead. The caller commits.
+        """
+        dates = set(dates)
+        if not dates:
+            return
+        
+        plans = cls.query.filter(
+            cls.user_id == user_id,
+            cls.start_date <= max(dates),
+            db.or_(cls.end_date.is_(None), cls.end_date >= min(dates))
+        )
+        for plan in plans:
+            if plan.progress_through is not None and min(dates) <= plan.progress_through:
+                plan.rebuild_progress()
+            else:
+                plan._fold(plan._tracked_days(after=plan.progress_through))
+    
+    @classmethod
+    def completed_count(cls, user_id):
+        """Plans the user has finished, i.e. no longer active, as the detox achievement counts them"""
+        return cls.query.filter(cls.user_id == user_id, cls.is_active == False).count()
+
+class WellbeingScore(db.Model):
+    """Daily snapshot of a user's 0-100 wellbeing score over the trailing week"""
+    __table_args__ = (
+        # Also serves the per-user history range read
+        db.UniqueConstraint('user_id', 'date', name='uq_wellbeing_score_user_id_date'),
+    )
+    
+    # Days of rollup each score looks back over, ending on its date
+    WINDOW_DAYS = 7
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    score = db.Column(db.Integer, nullable=False)
+    habit_score = db.Column(db.Integer, nullable=False)  # Out of 50: habit completion rate
+    screen_score = db.Column(db.Integer, nullable=False)  # Out of 50: lower daily screen time scores higher
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<WellbeingScore {self.user_id} on {self.date}: {self.score}>'
+    
+    @staticmethod
+    def components(habits_logged, habits_completed, screen_minutes, days):
+        """(habit_score, screen_score) from a window's rollup totals, as in the weekly report"""
+        habit_score = habits_completed / habits_logged * 50 if habits_logged else 0
+        screen_score = max(0, 50 - screen_minutes / days / 12)
+        return int(round(habit_score)), int(round(screen_score))
+    
+    @classmethod
+    def compute(cls, dates, user_ids=None):
+        """Score the given dates from the daily rollup without writing anything.
+        
+        One rollup query covers every date's window. Returns one row dict per
+        user and date, for everyone with data or just user_ids.
+        """
+        dates = set(dates)
+        if not dates or (user_ids is not None and not user_ids):
+            return []
+        
+        rows = db.session.query(
+            UserDailyStats.user_id, UserDailyStats.date, UserDailyStats.habits_logged,
+            UserDailyStats.habits_completed, UserDailyStats.screen_minutes
+        ).filter(
+            UserDailyStats.date > min(dates) - timedelta(days=cls.WINDOW_DAYS),
+            UserDailyStats.date <= max(dates)
+        )
+        if user_ids is not None:
+            user_ids = list(user_ids)
+            rows = rows.filter(UserDailyStats.user_id.in_(user_ids))
+        
+        by_user = {user_id: {} for user_id in user_ids or []}
+        for user_id, day, logged, completed, minutes in rows:
+            by_user.setdefault(user_id, {})[day] = (logged, completed, minutes)
+        
+        values = []
+        for user_id, days in by_user.items():
+            for day in dates:
+                window = [days.get(day - timedelta(days=i), (0, 0, 0)) for i in range(cls.WINDOW_DAYS)]
+                habit_score, screen_score = cls.components(
+                    sum(w[0] for w in window), sum(w[1] for w in window), sum(w[2] for w in window), cls.WINDOW_DAYS
+                )
+                values.append({
+                    'user_id': user_id,
+                    'date': day,
+                    'score': habit_score + screen_score,
+                    'habit_score': habit_score,
+                    'screen_score': screen_score,
+                    'created_at': datetime.utcnow()
+                })
+        return values
+    
+    @classmethod
+    def snapshot(cls, dates, user_ids=None, batch_size=5000):
+        """Score the given dates with compute and store them, replacing existing scores for those users and dates.
+        
+        Returns the number of rows written. The caller commits.
+        """
+        dates = set(dates)
+        if not dates or (user_ids is not None and not user_ids):
+            return 0
+        
+        values = cls.compute(dates, user_ids)
+        stale = db.delete(cls).where(cls.date.in_(dates))
+        if user_ids is not None:
+            stale = stale.where(cls.user_id.in_(list(user_ids)))
+        
+        db.session.execute(stale)
+        for start in range(0, len(values), batch_size):
+            db.session.execute(db.insert(cls), values[start:start + batch_size])
+        return len(values)
+    
+    @classmethod
+    def history(cls, user_id, start, end=None):
+        """(date, score) pairs for a user between start and end (inclusive), oldest first"""
+        query = db.session.query(cls.date, cls.score).filter(cls.user_id == user_id, cls.date >= start)
+        if end is not None:
+            query = query.filter(cls.date <= end)
+        return query.order_by(cls.date).all()
 
 class Achievement(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -214,7 +1068,7 @@ class Achievement(db.Model):
 
 class UserAchievement(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     achievement_id = db.Column(db.Integer, db.ForeignKey('achievement.id'), nullable=False)
     earned_date = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -222,6 +1076,10 @@ class UserAchievement(db.Model):
         return f'<UserAchievement {self.user_id} - {self.achievement_id}>'
 
 class DigitalTwin(db.Model):
+    __table_args__ = (
+        db.Index('ix_digital_twin_habit_id_user_id', 'habit_id', 'user_id'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     habit_id = db.Column(db.Integer, db.ForeignKey('habit.id'), nullable=False)
@@ -0,0 +1,95 @@
+from datetime import date
+import numpy as np
+
+# Chart bucket widths and the default and hard caps on points in one response
+BUCKETS = ('day', 'week', 'month')
+DEFAULT_MAX_POINTS = 365
+MAX_POINTS = 2000
+
+
+def chart_args(args):
+    """Parse bucket, start, end and max_points from request args.
+
+    Raises ValueError with a message for the client on bad input.
+    """
+    bucket = args.get('bucket', 'day')
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+    try:
+        start = date.fromisoformat(args['start']) if args.get('start') else None
+        end = date.fromisoformat(args['end']) if args.get('end') else None
+    except ValueError:
+        raise ValueError('start and end must be YYYY-MM-DD dates')
+    max_points = args.get('max_points', DEFAULT_MAX_POINTS, type=int)
+    if max_points is None or max_points < 3:
+        raise ValueError('max_points must be an integer of at least 3')
+    return bucket, start, end, min(max_points, MAX_POINTS)
+
+
+def bucket_starts(days, bucket):
+    """First day of the day, ISO week (Monday) or month bucket holding each datetime64[D] day"""
+    if bucket == 'week':
+        # 1970-01-01 was a Thursday, three days after a Monday
+        return days - (days.astype('int64') + 3) % 7
+    if bucket == 'month':
+        return days.astype('datetime64[M]').astype('datetime64[D]')
+    return days
+
+
+def bucketize(days, columns, bucket):
+    """Sum each value column per bucket.
+
+    Returns (bucket starts, [per-column sums], days with data per bucket),
+    oldest bucket first. Buckets without any day are omitted.
+    """
+    days = np.asarray(days, dtype='datetime64[D]')
+    keys, inverse = np.unique(bucket_starts(days, bucket), return_inverse=True)
+    sums = [np.bincount(inverse, weights=np.asarray(column, dtype=float), minlength=len(keys)) for column in columns]
+    return keys, sums, np.bincount(inverse, minlength=len(keys))
+
+
+def lttb(x, y, threshold):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets decimation.
+
+    Keeps the first and last point and, from each of threshold - 2 equal
+    buckets in between, the point forming the largest triangle with the
+    previously kept point and the average of the next bucket, so peaks and
+    troughs survive. Returns every index when there are threshold points or fewer.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    keep = np.empty(threshold, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x, next_y = x[end:edges[i + 2]].mean(), y[end:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        keep[i + 1] = previous
+    return keep
+
+
+def series_payload(keys, values, bucket, max_points):
+    """JSON-ready {"x", "y"} series of at most max_points points, decimated with lttb if longer"""
+    keys = np.asarray(keys, dtype='datetime64[D]')
+    values = np.asarray(values, dtype=float)
+    kept = lttb(keys.astype('int64'), values, max_points)
+    return {
+        'bucket': bucket,
+        'x': [str(day) for day in keys[kept]],
+        'y': [round(float(value), 2) for value in values[kept]],
+        'points': len(keys),
+        'downsampled': len(kept) < len(keys)
+    }
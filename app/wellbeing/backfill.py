@@ -0,0 +1,218 @@
+import os
+import shutil
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+import pandas as pd
+from app import db
+from app.models import User, ScreenTime, ScreenTimeUpload
+from app.wellbeing.ingest import (
+    DEFAULT_BATCH_SIZE, MAX_REPORTED_ERRORS, CHUNK_READERS, ScreenTimeFileError,
+    iter_screen_time_chunks, check_rows, file_hash, write_chunk, refresh_derived
+)
+from app.wellbeing.usage import invalidate_usage
+
+# Columns a user can be matched on from an export's file or directory name
+USER_KEYS = ('username', 'email', 'id')
+
+# A parsed export as returned by a worker process: its valid rows are spooled
+# to one pickle per chunk; error is set instead on failure
+ParsedFile = namedtuple('ParsedFile', [
+    'path', 'user_key', 'chunks', 'rows', 'rejected', 'errors', 'content_hash', 'byte_size', 'seconds', 'error'
+])
+
+# Per-file outcome reported back to the command
+FileResult = namedtuple('FileResult', ['path', 'user_key', 'status', 'rows', 'rejected', 'parse_seconds', 'write_seconds'])
+
+BackfillStats = namedtuple('BackfillStats', ['files', 'rows', 'users', 'seconds'])
+
+
+def find_exports(directory):
+    """Map every supported export under directory to its user key.
+
+    Files at the top level belong to the user named by their stem
+    (alice.csv); files in a subdirectory belong to the user named by the
+    subdirectory (alice/2023.xlsx).
+    """
+    exports = []
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            stem, extension = os.path.splitext(name)
+            if extension.lower() not in CHUNK_READERS:
+                continue
+            path = os.path.join(root, name)
+            parts = os.path.relpath(path, directory).split(os.sep)
+            exports.append((path, parts[0] if len(parts) > 1 else stem))
+    return sorted(exports)
+
+
+def _describe_error(error):
+    """Status text for a file that could not be imported"""
+    if isinstance(error, ScreenTimeFileError):
+        return str(error)
+    return f"{type(error).__name__}: {error}"
+
+
+def _discard(chunks):
+    for chunk_path in chunks:
+        try:
+            os.remove(chunk_path)
+        except OSError:
+            pass
+
+
+def parse_export(path, user_key, spool_dir, chunk_size=DEFAULT_BATCH_SIZE):
+    """Parse and validate one export file. Runs in a worker process.
+
+    Valid rows are pickled into spool_dir chunk by chunk as they are parsed,
+    so neither the worker nor the writer holds a whole file in memory. Any
+    error, not only ScreenTimeFileError, is returned as the file's error and
+    its spooled chunks are removed.
+    """
+    start = time.perf_counter()
+    chunks = []
+    try:
+        content_hash = file_hash(path)
+        rows = 0
+        rejected = 0
+        errors = []
+        for chunk in iter_screen_time_chunks(path, chunk_size=chunk_size):
+            check = check_rows(chunk, max_errors=MAX_REPORTED_ERRORS - len(errors))
+            if len(check.valid):
+                fd, chunk_path = tempfile.mkstemp(suffix='.pkl', dir=spool_dir)
+                os.close(fd)
+                chunks.append(chunk_path)
+                check.valid.to_pickle(chunk_path)
+            rows += len(check.valid)
+            rejected += check.rejected
+            errors.extend(check.errors)
+        byte_size = os.path.getsize(path)
+    except Exception as e:
+        _discard(chunks)
+        return ParsedFile(path, user_key, [], 0, 0, [], None, None, time.perf_counter() - start, _describe_error(e))
+
+    return ParsedFile(
+        path, user_key, chunks, rows, rejected, errors, content_hash, byte_size,
+        time.perf_counter() - start, None
+    )
+
+
+def _load_users(user_keys, key):
+    """Resolve user keys to ids in one query"""
+    column = getattr(User, key)
+    values = [int(value) for value in user_keys if value.isdigit()] if key == 'id' else list(user_keys)
+    return {str(value): user_id for user_id, value in db.session.query(User.id, column).filter(column.in_(values))}
+
+
+def _write_export(parsed, user_id, directory, batch_size):
+    """Upsert one parsed export as a ScreenTimeUpload and commit it"""
+    start = time.perf_counter()
+    upload = ScreenTimeUpload(
+        filename=os.path.basename(parsed.path)[:100],
+        original_filename=os.path.relpath(parsed.path, directory)[:255],
+        content_hash=parsed.content_hash,
+        byte_size=parsed.byte_size,
+        status=ScreenTimeUpload.COMPLETED,
+        row_count=parsed.rows,
+        rejected_count=parsed.rejected,
+        error_report=[{'row': row, 'errors': reasons} for row, reasons in parsed.errors],
+        started_at=datetime.utcnow(),
+        user_id=user_id
+    )
+    db.session.add(upload)
+    db.session.flush()
+
+    dates = set()
+    for chunk_path in parsed.chunks:
+        dates |= write_chunk(pd.read_pickle(chunk_path), user_id, upload.id, batch_size)
+    refresh_derived(user_id, dates)
+
+    if parsed.rejected and not parsed.rows:
+        upload.status = ScreenTimeUpload.FAILED
+        upload.error = f"None of the {parsed.rejected} rows in the file were valid."
+    upload.first_date = min(dates, default=None)
+    upload.last_date = max(dates, default=None)
+    upload.import_seconds = parsed.seconds + time.perf_counter() - start
+    upload.finished_at = datetime.utcnow()
+    db.session.commit()
+    invalidate_usage(user_id)
+    return time.perf_counter() - start
+
+
+def backfill_directory(directory, key='username', workers=None, chunk_size=DEFAULT_BATCH_SIZE,
+                       batch_size=DEFAULT_BATCH_SIZE, force=False, report=None):
+    """Import every export under directory for the users they are named after.
+
+    Files are parsed and validated in a process pool while this process is
+    the single writer, upserting each file in batches and committing it as a
+    ScreenTimeUpload. Files already imported for the same user are skipped
+    unless force is set. A file that fails to parse or write is reported with
+    an 'error: ...' status and the run moves on. The ScreenTime aggregates of
+    every affected user are rebuilt at the end. report(FileResult) is called
+    as each file finishes.
+    """
+    if key not in USER_KEYS:
+        raise ValueError(f"Unknown user key: {key}")
+
+    start = time.perf_counter()
+    exports = find_exports(directory)
+    users = _load_users({user_key for _, user_key in exports}, key)
+    imported = set()
+    if not force:
+        imported = set(db.session.query(ScreenTimeUpload.user_id, ScreenTimeUpload.content_hash).filter(
+            ScreenTimeUpload.status != ScreenTimeUpload.FAILED,
+            ScreenTimeUpload.content_hash.isnot(None)
+        ))
+
+    affected = set()
+    rows = 0
+    files = 0
+    spool_dir = tempfile.mkdtemp(prefix='screen-time-backfill-')
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(parse_export, path, user_key, spool_dir, chunk_size): (path, user_key)
+                for path, user_key in exports if user_key in users
+            }
+            for path, user_key in exports:
+                if user_key not in users and report is not None:
+                    report(FileResult(path, user_key, 'unknown user', 0, 0, 0.0, 0.0))
+
+            for future in as_completed(futures):
+                try:
+                    parsed = future.result()
+                except Exception as e:
+                    path, user_key = futures[future]
+                    parsed = ParsedFile(path, user_key, [], 0, 0, [], None, None, 0.0, _describe_error(e))
+                user_id = users[parsed.user_key]
+                write_seconds = 0.0
+                if parsed.error:
+                    status = f'error: {parsed.error}'
+                elif (user_id, parsed.content_hash) in imported:
+                    status = 'already imported'
+                else:
+                    try:
+                        write_seconds = _write_export(parsed, user_id, directory, batch_size)
+                    except Exception as e:
+                        db.session.rollback()
+                        status = f'error: {_describe_error(e)}'
+                    else:
+                        imported.add((user_id, parsed.content_hash))
+                        affected.add(user_id)
+                        rows += parsed.rows
+                        files += 1
+                        status = 'imported'
+                _discard(parsed.chunks)
+                if report is not None:
+                    report(FileResult(
+                        parsed.path, parsed.user_key, status,
+                        parsed.rows, parsed.rejected, parsed.seconds, write_seconds
+                    ))
+    finally:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+
+    if affected:
+        ScreenTime.generate_for_users(sorted(affected))
+    return BackfillStats(files, rows, len(affected), time.perf_counter() - start)
@@ -2,11 +2,12 @@ from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileAllowed, FileRequired
 from wtforms import SubmitField, IntegerField, StringField, BooleanField
 from wtforms.validators import NumberRange, Optional, DataRequired
+from app.wellbeing.ingest import ALLOWED_EXTENSIONS
 
 class UploadScreenTimeForm(FlaskForm):
-    excel_file = FileField('Upload Excel File', validators=[
+    screen_time_file = FileField('Upload Screen Time File', validators=[
         FileRequired(),
-        FileAllowed(['xlsx'], 'Excel files only!')
+        FileAllowed(ALLOWED_EXTENSIONS, 'Excel, CSV or Parquet files only!')
     ])
     submit = SubmitField('Upload')
 
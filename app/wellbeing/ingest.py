@@ -0,0 +1,489 @@
+import hashlib
+import json
+import os
+import re
+import time
+from collections import namedtuple
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from flask import current_app
+from app import db
+from app.models import User, ScreenTimeLog, ScreenTimeUpload, UserDailyStats, AppLimitStatus, DigitalDetoxPlan
+from app.wellbeing.usage import invalidate_usage
+
+# Rows per executemany batch when inserting screen time logs
+DEFAULT_BATCH_SIZE = 5000
+
+# Rejected rows listed in an upload's validation report; the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+
+REQUIRED_COLUMNS = ['Date', 'App Name', 'Usage (Minutes)']
+
+# API record fields and the upload columns they map to
+RECORD_FIELDS = {'date': 'Date', 'app_name': 'App Name', 'minutes': 'Usage (Minutes)'}
+
+MAX_DAILY_MINUTES = 24 * 60
+MAX_APP_NAME_LENGTH = ScreenTimeLog.__table__.c.app_name.type.length
+
+
+class ScreenTimeFileError(Exception):
+    """Raised when an uploaded screen time file cannot be imported"""
+
+
+# Rows that passed check_rows, coerced to column types, the rejected row count
+# and (row label, reasons) for the rejected rows
+RowCheck = namedtuple('RowCheck', ['valid', 'rejected', 'errors'])
+
+# Outcome of an API batch: accepted row count and per-record errors
+RecordResult = namedtuple('RecordResult', ['accepted', 'errors'])
+
+
+class ImportStats(namedtuple('ImportStats', ['rows', 'seconds', 'first_date', 'last_date', 'rejected', 'errors'],
+                             defaults=(None, None, 0, ()))):
+    """Imported row count, wall time and covered date range of a screen time
+    import, plus the rejected row count and (row, reasons) for some of them"""
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds > 0 else float(self.rows)
+
+
+def _upsert_mode():
+    return current_app.config.get('SCREEN_TIME_UPSERT_MODE', 'replace')
+
+
+def write_chunk(df, user_id, upload_id=None, batch_size=DEFAULT_BATCH_SIZE, mode=None):
+    """Upsert one validated DataFrame through the core table in executemany batches.
+
+    Rows repeating a (date, app) key inside the chunk are merged first, keeping
+    the last value or summing them according to mode, which defaults to the
+    app's SCREEN_TIME_UPSERT_MODE. Returns the dates written; pass them to
+    refresh_derived. The caller commits.
+    """
+    mode = mode or _upsert_mode()
+    df = df.assign(**{'App Name': df['App Name'].astype(str)})
+    merged = df.groupby(['Date', 'App Name'], sort=False)['Usage (Minutes)']
+    merged = merged.sum() if mode == 'sum' else merged.last()
+
+    ScreenTimeLog.upsert([
+        {
+            'date': day,
+            'app_name': app_name,
+            'usage_minutes': int(usage),
+            'upload_id': upload_id,
+            'user_id': user_id
+        }
+        for (day, app_name), usage in merged.items()
+    ], mode=mode, batch_size=batch_size)
+    return set(merged.index.get_level_values(0))
+
+
+def refresh_derived(user_id, dates):
+    """Recompute the rollup days, app-limit statuses and detox progress touched by an insert. The caller commits."""
+    UserDailyStats.refresh_screen_time(user_id, dates)
+    AppLimitStatus.evaluate(dates, user_ids=[user_id])
+    DigitalDetoxPlan.refresh_progress(user_id, dates)
+    User.bump_data_version(user_id)
+
+
+def file_hash(file_path, block_size=1 << 20):
+    """SHA-256 hex digest of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Row check failures, in the order their bits appear in a row's reason code
+ROW_PROBLEMS = ['invalid date', 'missing app name', 'app name too long', 'invalid minutes', 'minutes out of range']
+
+# Reasons for every combination of failed checks, indexed by reason code
+_REASONS_BY_CODE = [
+    [problem for bit, problem in enumerate(ROW_PROBLEMS) if code & (1 << bit)]
+    for code in range(1 << len(ROW_PROBLEMS))
+]
+
+
+# UTC offset after the time of a timestamp (Z, +01:00, -0500); group 1 is the time before it
+_UTC_OFFSET = re.compile(r'([T ]\d{2}(?::?\d{2}){0,2}(?:[.,]\d+)?)\s*(?:Z|[+-]\d{2}(?::?\d{2})?)$')
+
+
+def _is_text(values):
+    return pd.api.types.infer_dtype(values, skipna=True) in ('string', 'mixed', 'mixed-integer')
+
+
+def _drop_offsets(raw_dates):
+    """raw_dates with the UTC offset cut off every date string, keeping its wall-clock time"""
+    if not _is_text(raw_dates):
+        return raw_dates
+    stripped = raw_dates.str.strip().str.replace(_UTC_OFFSET, r'\1', regex=True)
+    return stripped.where(stripped.notna(), raw_dates)
+
+
+def _local_dates(raw_dates, date_format):
+    """Parse a column whose UTC offsets differ between rows, keeping each row's local date.
+
+    Every value is validated by one UTC parse and its local date read from its
+    leading YYYY-MM-DD, so times come back as midnight. Only values that
+    parse but do not start with one have their offset stripped with a regex
+    and are parsed again.
+    """
+    instants = pd.to_datetime(raw_dates, errors='coerce', format=date_format, utc=True)
+    days = raw_dates.str.slice(0, 10) if _is_text(raw_dates) else pd.Series(None, index=raw_dates.index, dtype=object)
+    dates = pd.to_datetime(days, errors='coerce', format='%Y-%m-%d').where(instants.notna())
+
+    leftover = instants.notna() & dates.isna()
+    if leftover.any():
+        retried = _to_naive_datetimes(_drop_offsets(raw_dates[leftover].astype(str)), date_format, local=False)
+        if retried is not None:
+            dates[leftover] = retried
+    return dates
+
+
+def _to_naive_datetimes(raw_dates, date_format, local=True):
+    """pd.to_datetime with errors='coerce', always returning naive datetimes.
+
+    A single offset is dropped after parsing. A mix of offsets, or of offset
+    and plain values, is handed to _local_dates if local is set; otherwise
+    None is returned.
+    """
+    try:
+        dates = pd.to_datetime(raw_dates, errors='coerce', format=date_format)
+    except ValueError:
+        # Newer pandas refuses mixed offsets even with errors='coerce'
+        dates = None
+    if dates is None or not pd.api.types.is_datetime64_any_dtype(dates):
+        return _local_dates(raw_dates, date_format) if local else None
+    if isinstance(dates.dtype, pd.DatetimeTZDtype):
+        return dates.dt.tz_localize(None)
+    return dates
+
+
+def _parse_dates(raw_dates, date_format=None):
+    """Parse a raw date column to naive datetimes, NaT where a value is not a date.
+
+    Each row keeps its local date, also when offsets differ between rows (say
+    across a DST change), without a Python call per row. Values are parsed as
+    ISO first, falling back to format inference for the rest unless
+    date_format is given.
+    """
+    if isinstance(raw_dates.dtype, pd.DatetimeTZDtype):
+        return raw_dates.dt.tz_localize(None)
+
+    dates = _to_naive_datetimes(raw_dates, date_format or 'ISO8601')
+    if date_format is None:
+        # Fall back to format inference only for the values that are not ISO dates
+        retry = dates.isna() & raw_dates.notna()
+        if retry.any():
+            dates[retry] = _to_naive_datetimes(raw_dates[retry].astype(str), 'mixed')
+    return dates
+
+
+def check_rows(df, date_format=None, max_errors=None):
+    """Check every row of a raw screen time frame in one columnar pass.
+
+    Values are coerced with errors='coerce' and each check is a boolean mask.
+    Dates are parsed by _parse_dates, keeping each row's local date;
+    the masks are packed into one reason code per row. Returns a RowCheck with
+    the valid rows coerced to date / stripped str / int, the number of
+    rejected rows, and (row label, reasons) for up to max_errors of them.
+    """
+    dates = _parse_dates(df['Date'], date_format)
+    names = df['App Name']
+    names = names.where(names.notna(), '').astype(str).str.strip()
+    minutes = pd.to_numeric(df['Usage (Minutes)'], errors='coerce')
+
+    masks = np.column_stack([
+        dates.isna().to_numpy(),
+        names.eq('').to_numpy(),
+        (names.str.len() > MAX_APP_NAME_LENGTH).to_numpy(),
+        (minutes.isna() | (minutes % 1 != 0)).to_numpy(),
+        ((minutes < 0) | (minutes > MAX_DAILY_MINUTES)).to_numpy(),
+    ])
+    codes = masks.astype(np.int64) @ (1 << np.arange(len(ROW_PROBLEMS)))
+    invalid = codes > 0
+
+    rejected = np.flatnonzero(invalid)[:max_errors]
+    errors = [
+        (label, _REASONS_BY_CODE[code])
+        for label, code in zip(df.index[rejected].tolist(), codes[rejected].tolist())
+    ]
+
+    keep = ~invalid
+    valid = pd.DataFrame({
+        'Date': dates[keep].dt.date,
+        'App Name': names[keep],
+        'Usage (Minutes)': minutes[keep].astype(int),
+    }).reset_index(drop=True)
+    return RowCheck(valid, int(invalid.sum()), errors)
+
+
+def iter_excel_chunks(file_path, chunk_size=DEFAULT_BATCH_SIZE):
+    """Stream a screen time workbook as raw DataFrames of chunk_size rows.
+
+    The sheet is read with openpyxl in read-only mode, so memory stays roughly
+    constant however many rows it has. Chunks are indexed by sheet row number.
+    """
+    try:
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+    except Exception as e:
+        raise ScreenTimeFileError(f"Error parsing Excel file: {str(e)}")
+
+    try:
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [str(value).strip() if value is not None else '' for value in next(rows, ())]
+        except Exception as e:
+            raise ScreenTimeFileError(f"Error parsing Excel file: {str(e)}")
+
+        # Check if the required columns exist
+        for col in REQUIRED_COLUMNS:
+            if col not in header:
+                raise ScreenTimeFileError(f"Missing required column: {col}")
+        positions = [header.index(col) for col in REQUIRED_COLUMNS]
+
+        try:
+            chunk = []
+            row_numbers = []
+            for row_number, row in enumerate(rows, start=2):
+                values = [row[i] if i < len(row) else None for i in positions]
+                if all(value is None for value in values):
+                    continue
+                chunk.append(values)
+                row_numbers.append(row_number)
+                if len(chunk) == chunk_size:
+                    yield pd.DataFrame(chunk, columns=REQUIRED_COLUMNS, index=row_numbers)
+                    chunk = []
+                    row_numbers = []
+            if chunk:
+                yield pd.DataFrame(chunk, columns=REQUIRED_COLUMNS, index=row_numbers)
+        except Exception as e:
+            raise ScreenTimeFileError(f"Error parsing Excel file: {str(e)}")
+    finally:
+        workbook.close()
+
+
+def iter_csv_chunks(file_path, chunk_size=DEFAULT_BATCH_SIZE):
+    """Stream a screen time CSV export as raw DataFrames of chunk_size rows.
+
+    Only the required columns are parsed, chunk by chunk, with pandas' C reader.
+    Chunks are indexed by line number, counting the header as line 1.
+    """
+    try:
+        raw_header = list(pd.read_csv(file_path, nrows=0).columns)
+    except Exception as e:
+        raise ScreenTimeFileError(f"Error parsing CSV file: {str(e)}")
+
+    header = [str(col).strip() for col in raw_header]
+    for col in REQUIRED_COLUMNS:
+        if col not in header:
+            raise ScreenTimeFileError(f"Missing required column: {col}")
+    names = {raw_header[header.index(col)]: col for col in REQUIRED_COLUMNS}
+
+    try:
+        reader = pd.read_csv(
+            file_path,
+            usecols=list(names),
+            dtype={raw: str for raw, col in names.items() if col == 'App Name'},
+            skip_blank_lines=False,
+            chunksize=chunk_size
+        )
+        for chunk in reader:
+            chunk = chunk.rename(columns=names)[REQUIRED_COLUMNS].dropna(how='all')
+            if len(chunk):
+                chunk.index = chunk.index + 2
+                yield chunk
+    except Exception as e:
+        raise ScreenTimeFileError(f"Error parsing CSV file: {str(e)}")
+
+
+def iter_parquet_chunks(file_path, chunk_size=DEFAULT_BATCH_SIZE):
+    """Stream a screen time Parquet export as raw DataFrames of chunk_size rows.
+
+    Only the required columns are read from the file, one record batch at a
+    time. Chunks are numbered like a spreadsheet, so the first record is row 2.
+    Needs pyarrow, which is imported on first use.
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ScreenTimeFileError("Parquet uploads require the pyarrow package to be installed")
+
+    try:
+        parquet_file = pq.ParquetFile(file_path)
+    except Exception as e:
+        raise ScreenTimeFileError(f"Error parsing Parquet file: {str(e)}")
+
+    raw_header = parquet_file.schema_arrow.names
+    header = [col.strip() for col in raw_header]
+    for col in REQUIRED_COLUMNS:
+        if col not in header:
+            raise ScreenTimeFileError(f"Missing required column: {col}")
+    names = {raw_header[header.index(col)]: col for col in REQUIRED_COLUMNS}
+
+    try:
+        offset = 2
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=list(names)):
+            chunk = batch.to_pandas().rename(columns=names)[REQUIRED_COLUMNS]
+            chunk.index = chunk.index + offset
+            offset += len(chunk)
+            chunk = chunk.dropna(how='all')
+            if len(chunk):
+                yield chunk
+    except Exception as e:
+        raise ScreenTimeFileError(f"Error parsing Parquet file: {str(e)}")
+
+
+# Chunk readers by file extension
+CHUNK_READERS = {
+    '.xlsx': iter_excel_chunks,
+    '.csv': iter_csv_chunks,
+    '.parquet': iter_parquet_chunks,
+}
+
+ALLOWED_EXTENSIONS = [extension.lstrip('.') for extension in CHUNK_READERS]
+
+
+def iter_screen_time_chunks(file_path, chunk_size=DEFAULT_BATCH_SIZE):
+    """Stream any supported screen time file, picking the reader by extension"""
+    _, extension = os.path.splitext(file_path)
+    reader = CHUNK_READERS.get(extension.lower())
+    if reader is None:
+        raise ScreenTimeFileError(f"Unsupported file type: {extension or 'none'}")
+    return reader(file_path, chunk_size=chunk_size)
+
+
+def import_screen_time_file(file_path, user_id, upload_id=None, chunk_size=DEFAULT_BATCH_SIZE, progress=None):
+    """Stream a screen time file (Excel, CSV or Parquet) into the upsert path.
+
+    Each chunk is checked with check_rows, its valid rows upserted and their
+    rollup days and app-limit statuses refreshed as soon as it is parsed; rejected rows are counted
+    and the first MAX_REPORTED_ERRORS kept for the report. progress(rows,
+    rejected) is called after every chunk if given. Raises ScreenTimeFileError if the file
+    itself is unreadable, in which case the caller should roll back. The
+    caller commits on success.
+    """
+    start = time.perf_counter()
+    mode = _upsert_mode()
+    rows = 0
+    rejected = 0
+    errors = []
+    covered = set()
+    for chunk in iter_screen_time_chunks(file_path, chunk_size=chunk_size):
+        check = check_rows(chunk, max_errors=MAX_REPORTED_ERRORS - len(errors))
+        rejected += check.rejected
+        errors.extend(check.errors)
+        if len(check.valid):
+            dates = write_chunk(check.valid, user_id, upload_id, chunk_size, mode)
+            refresh_derived(user_id, dates)
+            covered |= dates
+        rows += len(check.valid)
+        if progress is not None:
+            progress(rows, rejected)
+
+    return ImportStats(
+        rows, time.perf_counter() - start, min(covered, default=None), max(covered, default=None),
+        rejected, errors
+    )
+
+
+def run_import_job(upload_id, file_path, chunk_size=DEFAULT_BATCH_SIZE):
+    """Import a queued upload on the executor, recording progress on it.
+
+    Every chunk is committed together with the upload's row_count so the
+    progress endpoint can see it. Rejected rows are stored as the upload's
+    validation report. If the file cannot be read, the upload is marked
+    failed with the error message; chunks already committed stay, and since
+    rows replace stored ones a corrected re-upload converges on the same
+    data. In 'sum' mode that would count the committed chunks twice, so the
+    whole file is imported in one transaction and a failure rolls all of it
+    back. The user's cached usage summaries are dropped after every commit.
+    """
+    upload = db.session.get(ScreenTimeUpload, upload_id)
+    upload.status = ScreenTimeUpload.RUNNING
+    upload.started_at = datetime.utcnow()
+    db.session.commit()
+
+    def progress(rows, rejected):
+        upload.row_count = rows
+        upload.rejected_count = rejected
+        db.session.commit()
+        invalidate_usage(upload.user_id)
+
+    try:
+        stats = import_screen_time_file(
+            file_path, upload.user_id, upload_id=upload.id,
+            chunk_size=chunk_size, progress=None if _upsert_mode() == 'sum' else progress
+        )
+    except Exception as e:
+        db.session.rollback()
+        if isinstance(e, ScreenTimeFileError):
+            upload.error = str(e)
+        else:
+            current_app.logger.exception('Screen time upload %d failed to import', upload_id)
+            upload.error = 'Unexpected error while importing the file.'
+        upload.status = ScreenTimeUpload.FAILED
+    else:
+        upload.status = ScreenTimeUpload.COMPLETED
+        upload.row_count = stats.rows
+        upload.rejected_count = stats.rejected
+        upload.error_report = [{'row': row, 'errors': reasons} for row, reasons in stats.errors]
+        upload.first_date = stats.first_date
+        upload.last_date = stats.last_date
+        upload.import_seconds = stats.seconds
+        if stats.rejected and not stats.rows:
+            upload.status = ScreenTimeUpload.FAILED
+            upload.error = f"None of the {stats.rejected} rows in the file were valid."
+        current_app.logger.info(
+            'Imported %d screen time rows (%d rejected) for user %d in %.2fs (%.0f rows/s)',
+            stats.rows, stats.rejected, upload.user_id, stats.seconds, stats.rows_per_second
+        )
+    upload.finished_at = datetime.utcnow()
+    db.session.commit()
+    invalidate_usage(upload.user_id)
+    return upload.status
+
+
+def parse_ndjson(text):
+    """One record per non-blank line; lines that are not valid JSON become None"""
+    records = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            records.append(None)
+    return records
+
+
+def import_records(records, user_id, mode=None):
+    """Validate and upsert one batch of API records for a user.
+
+    Records are {"date", "app_name", "minutes"} objects. Valid ones are upserted
+    and their rollup days and app-limit statuses refreshed; errors carry the index of each rejected
+    record. The caller commits, so a batch is one transaction.
+    """
+    frame = pd.DataFrame({
+        column: [record.get(field) if isinstance(record, dict) else None for record in records]
+        for field, column in RECORD_FIELDS.items()
+    }, columns=REQUIRED_COLUMNS)
+    # Only ISO date strings count; pandas would read bare numbers as epoch offsets
+    frame['Date'] = frame['Date'].where(frame['Date'].map(lambda value: isinstance(value, str)))
+    # JSON booleans are not minutes, though pandas would read true as 1
+    frame['Usage (Minutes)'] = frame['Usage (Minutes)'].where(
+        ~frame['Usage (Minutes)'].map(lambda value: isinstance(value, bool))
+    )
+    check = check_rows(frame, date_format='ISO8601')
+
+    errors = [
+        {'index': position, 'errors': reasons if isinstance(records[position], dict) else ['record must be a JSON object']}
+        for position, reasons in check.errors
+    ]
+    if len(check.valid):
+        dates = write_chunk(check.valid, user_id, mode=mode)
+        refresh_derived(user_id, dates)
+    return RecordResult(len(check.valid), errors)
@@ -1,45 +1,44 @@
 import os
 import secrets
-import pandas as pd
-from datetime import datetime
-from flask import Blueprint, render_template, url_for, flash, redirect, request, current_app
+from datetime import date, datetime, timedelta
+from flask import Blueprint, render_template, url_for, flash, redirect, request, current_app, jsonify, abort
 from flask_login import login_required, current_user
-from app import db
-from app.models import ScreenTimeLog, AppLimit
+from app import db, executor
+from app.models import User, ScreenTimeLog, ScreenTimeUpload, AppLimit, AppLimitStatus, UserDailyStats
+from app.timeseries import chart_args, bucketize, series_payload
 from app.wellbeing.forms import UploadScreenTimeForm, DigitalDetoxForm, AppLimitForm
+from app.wellbeing.ingest import run_import_job, file_hash, parse_ndjson, import_records
+from app.wellbeing.usage import usage_summary, invalidate_usage
 
 wellbeing = Blueprint('wellbeing', __name__)
 
-def save_excel_file(form_excel):
-    random_hex = secrets.token_hex(8)
-    _, f_ext = os.path.splitext(form_excel.filename)
-    excel_fn = random_hex + f_ext
-    excel_path = os.path.join(current_app.root_path, 'static/uploads/excel_files', excel_fn)
-    form_excel.save(excel_path)
-    return excel_fn, excel_path
+# Dashboard aggregate windows in days
+WINDOW_DAYS = (7, 30, 90)
+DEFAULT_WINDOW_DAYS = 30
 
-def parse_excel_file(file_path):
-    try:
-        # Read the Excel file
-        df = pd.read_excel(file_path)
-        
-        # Check if the required columns exist
-        required_columns = ['Date', 'App Name', 'Usage (Minutes)']
-        for col in required_columns:
-            if col not in df.columns:
-                return False, f"Missing required column: {col}"
-        
-        # Validate data types
-        try:
-            df['Date'] = pd.to_datetime(df['Date']).dt.date
-            df['Usage (Minutes)'] = df['Usage (Minutes)'].astype(int)
-        except Exception as e:
-            return False, f"Data type error: {str(e)}"
-        
-        # Return the validated dataframe
-        return True, df
-    except Exception as e:
-        return False, f"Error parsing Excel file: {str(e)}"
+# Raw log rows rendered with the dashboard, and the cap on one JSON page
+DASHBOARD_LOG_ROWS = 7
+MAX_LOG_PAGE_SIZE = 200
+
+def encode_log_cursor(key):
+    """Turn a ScreenTimeLog.page key into a cursor string like '2024-05-01:123'"""
+    if key is None:
+        return None
+    log_date, log_id = key
+    return f'{log_date.isoformat()}:{log_id}'
+
+def decode_log_cursor(cursor):
+    """Inverse of encode_log_cursor; raises ValueError on a malformed cursor"""
+    log_date, _, log_id = cursor.partition(':')
+    return date.fromisoformat(log_date), int(log_id)
+
+def save_screen_time_file(form_file):
+    random_hex = secrets.token_hex(8)
+    _, f_ext = os.path.splitext(form_file.filename)
+    file_fn = random_hex + f_ext.lower()
+    file_path = os.path.join(current_app.config['EXCEL_FILES'], file_fn)
+    form_file.save(file_path)
+    return file_fn, file_path
 
 @wellbeing.route('/wellbeing')
 @login_required
@@ -48,27 +47,19 @@ def digital_wellbeing():
     from datetime import datetime
     today = datetime.now()
     
-    # Get screen time logs for the past 30 days
-    screen_time_logs = ScreenTimeLog.query.filter_by(user_id=current_user.id).order_by(ScreenTimeLog.date.desc()).all()
-    
-    # Calculate total screen time
-    total_screen_time = sum(log.usage_minutes for log in screen_time_logs)
-    
-    # Get app usage by app
-    app_usage = {}
-    for log in screen_time_logs:
-        if log.app_name in app_usage:
-            app_usage[log.app_name] += log.usage_minutes
-        else:
-            app_usage[log.app_name] = log.usage_minutes
+    # Aggregate over a fixed window of recent days
+    days = request.args.get('days', DEFAULT_WINDOW_DAYS, type=int)
+    if days not in WINDOW_DAYS:
+        days = DEFAULT_WINDOW_DAYS
     
-    # Sort apps by usage
-    top_apps = sorted(app_usage.items(), key=lambda x: x[1], reverse=True)
+    # Only the first page of raw logs is rendered; the rest come from wellbeing.list_screen_time_logs
+    screen_time_logs, next_key = ScreenTimeLog.page(current_user.id, limit=DASHBOARD_LOG_ROWS)
     
-    # Calculate daily average
-    dates = set(log.date for log in screen_time_logs)
-    daily_average = total_screen_time / len(dates) if dates else 0
-    daily_average = daily_average / 60  # Convert to hours
+    # Totals, app usage and daily average from the aggregation service
+    usage = usage_summary(current_user.id, since=today.date() - timedelta(days=days - 1))
+    total_screen_time = usage.total_minutes
+    top_apps = usage.app_totals
+    daily_average = usage.daily_average / 60  # Convert to hours
     
     # Get existing app limits
     app_limits = AppLimit.query.filter_by(user_id=current_user.id).all()
@@ -81,9 +72,61 @@ def digital_wellbeing():
         top_apps=top_apps,
         daily_average=daily_average,
         today=today,
-        app_limits=app_limits
+        app_limits=app_limits,
+        days=days,
+        window_days=WINDOW_DAYS,
+        days_tracked=usage.days,
+        next_cursor=encode_log_cursor(next_key)
     )
 
+@wellbeing.route('/wellbeing/logs')
+@login_required
+def list_screen_time_logs():
+    """Page through the user's raw screen time logs, newest first.
+    
+    Pass the returned next_cursor as ?before= to get the following page;
+    it is null on the last page.
+    """
+    limit = min(max(request.args.get('limit', 50, type=int), 1), MAX_LOG_PAGE_SIZE)
+    before = request.args.get('before')
+    try:
+        key = decode_log_cursor(before) if before else None
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    
+    logs, next_key = ScreenTimeLog.page(current_user.id, before=key, limit=limit)
+    return jsonify({
+        'logs': [log.to_dict() for log in logs],
+        'next_cursor': encode_log_cursor(next_key)
+    })
+
+@wellbeing.route('/wellbeing/api/charts/screen-time')
+@login_required
+def screen_time_chart():
+    """Average daily screen time in minutes per day, week or month bucket.
+    
+    Takes bucket, start, end (YYYY-MM-DD) and max_points; longer series are
+    decimated with LTTB so the response stays bounded for any history.
+    """
+    try:
+        bucket, start, end, max_points = chart_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Days with screen time data, from the daily rollup
+    query = db.session.query(UserDailyStats.date, UserDailyStats.screen_minutes).filter(
+        UserDailyStats.user_id == current_user.id,
+        UserDailyStats.top_app.isnot(None)
+    )
+    if start is not None:
+        query = query.filter(UserDailyStats.date >= start)
+    if end is not None:
+        query = query.filter(UserDailyStats.date <= end)
+    rows = query.order_by(UserDailyStats.date).all()
+    
+    keys, (minutes,), days = bucketize([row[0] for row in rows], [[row[1] for row in rows]], bucket)
+    return jsonify(series_payload(keys, minutes / days.clip(min=1), bucket, max_points))
+
 @wellbeing.route('/wellbeing/app-limits', methods=['GET', 'POST'])
 @login_required
 def app_limits():
@@ -92,17 +135,8 @@ def app_limits():
     # Get user's existing app limits
     existing_limits = AppLimit.query.filter_by(user_id=current_user.id).all()
     
-    # Get app usage data for suggestions
-    screen_time_logs = ScreenTimeLog.query.filter_by(user_id=current_user.id).all()
-    app_usage = {}
-    for log in screen_time_logs:
-        if log.app_name in app_usage:
-            app_usage[log.app_name] += log.usage_minutes
-        else:
-            app_usage[log.app_name] = log.usage_minutes
-    
-    # Sort apps by usage for suggestions
-    top_apps = sorted(app_usage.items(), key=lambda x: x[1], reverse=True)
+    # Apps sorted by usage for suggestions
+    top_apps = usage_summary(current_user.id).app_totals
     
     if form.validate_on_submit():
         # Check if limit already exists for this app
@@ -115,6 +149,8 @@ def app_limits():
             # Update existing limit
             existing_limit.daily_limit_minutes = form.daily_limit_minutes.data
             existing_limit.is_active = True
+            AppLimitStatus.evaluate([datetime.utcnow().date()], user_ids=[current_user.id])
+            User.bump_data_version(current_user.id)
             db.session.commit()
             flash(f'App limit updated for {form.app_name.data}', 'success')
         else:
@@ -125,19 +161,48 @@ def app_limits():
                 user_id=current_user.id
             )
             db.session.add(app_limit)
+            db.session.flush()
+            AppLimitStatus.evaluate([datetime.utcnow().date()], user_ids=[current_user.id])
+            User.bump_data_version(current_user.id)
             db.session.commit()
             flash(f'App limit set for {form.app_name.data}', 'success')
         
         return redirect(url_for('wellbeing.app_limits'))
     
+    # Today's usage against each active limit
+    today_statuses = {
+        limit.id: status for limit, status in AppLimitStatus.for_day(current_user.id, datetime.utcnow().date())
+        if status is not None
+    }
+    
     return render_template(
         'wellbeing/app_limits.html',
         title='App Usage Limits',
         form=form,
         existing_limits=existing_limits,
+        today_statuses=today_statuses,
         top_apps=top_apps[:10]  # Show top 10 apps for suggestions
     )
 
+@wellbeing.route('/wellbeing/app-limits/status')
+@login_required
+def app_limit_status():
+    """Today's usage and headroom for each of the user's active app limits"""
+    today = datetime.utcnow().date()
+    limits = []
+    for limit, status in AppLimitStatus.for_day(current_user.id, today):
+        usage = status.usage_minutes if status else 0
+        limits.append({
+            'id': limit.id,
+            'app_name': limit.app_name,
+            'limit_minutes': limit.daily_limit_minutes,
+            'usage_minutes': usage,
+            'headroom_minutes': limit.daily_limit_minutes - usage,
+            'exceeded': usage > limit.daily_limit_minutes
+        })
+    
+    return jsonify({'date': today.isoformat(), 'limits': limits})
+
 @wellbeing.route('/wellbeing/app-limits/delete/<int:limit_id>', methods=['POST'])
 @login_required
 def delete_app_limit(limit_id):
@@ -150,6 +215,7 @@ def delete_app_limit(limit_id):
     
     app_name = app_limit.app_name
     db.session.delete(app_limit)
+    User.bump_data_version(current_user.id)
     db.session.commit()
     
     flash(f'App limit for {app_name} has been removed', 'success')
@@ -167,6 +233,8 @@ def toggle_app_limit(limit_id):
     
     # Toggle the active status
     app_limit.is_active = not app_limit.is_active
+    AppLimitStatus.evaluate([datetime.utcnow().date()], user_ids=[current_user.id])
+    User.bump_data_version(current_user.id)
     db.session.commit()
     
     status = 'activated' if app_limit.is_active else 'deactivated'
@@ -178,32 +246,90 @@ def toggle_app_limit(limit_id):
 def upload_screen_time():
     form = UploadScreenTimeForm()
     if form.validate_on_submit():
-        excel_fn, excel_path = save_excel_file(form.excel_file.data)
+        file_fn, file_path = save_screen_time_file(form.screen_time_file.data)
+        content_hash = file_hash(file_path)
         
-        # Parse the Excel file
-        success, result = parse_excel_file(excel_path)
+        # Skip files this user has already imported or queued
+        existing_upload = ScreenTimeUpload.query.filter(
+            ScreenTimeUpload.user_id == current_user.id,
+            ScreenTimeUpload.content_hash == content_hash,
+            ScreenTimeUpload.status != ScreenTimeUpload.FAILED
+        ).order_by(ScreenTimeUpload.created_at.desc()).first()
+        if existing_upload:
+            os.remove(file_path)
+            flash('This file has already been uploaded, so nothing new was imported.', 'info')
+            return redirect(url_for('wellbeing.upload_screen_time', upload=existing_upload.id))
         
-        if success:
-            df = result
-            
-            # Save data to database
-            for _, row in df.iterrows():
-                log = ScreenTimeLog(
-                    date=row['Date'],
-                    app_name=row['App Name'],
-                    usage_minutes=row['Usage (Minutes)'],
-                    upload_file=excel_fn,
-                    user_id=current_user.id
-                )
-                db.session.add(log)
-            
-            db.session.commit()
-            flash('Your screen time data has been uploaded successfully!', 'success')
-            return redirect(url_for('wellbeing.digital_wellbeing'))
-        else:
-            flash(f'Error: {result}', 'danger')
+        # Queue the import so the request returns before the file is parsed
+        upload = ScreenTimeUpload(
+            filename=file_fn,
+            original_filename=form.screen_time_file.data.filename,
+            content_hash=content_hash,
+            byte_size=os.path.getsize(file_path),
+            user_id=current_user.id
+        )
+        db.session.add(upload)
+        db.session.commit()
+        executor.submit(run_import_job, upload.id, file_path)
+        
+        flash('Your screen time file has been uploaded and is being imported.', 'info')
+        return redirect(url_for('wellbeing.upload_screen_time', upload=upload.id))
+    
+    upload = None
+    upload_id = request.args.get('upload', type=int)
+    if upload_id is not None:
+        upload = ScreenTimeUpload.query.filter_by(id=upload_id, user_id=current_user.id).first()
+    
+    return render_template('wellbeing/upload.html', title='Upload Screen Time', form=form, upload=upload)
+
+@wellbeing.route('/wellbeing/uploads/<int:upload_id>/status')
+@login_required
+def upload_status(upload_id):
+    upload = ScreenTimeUpload.query.get_or_404(upload_id)
+    
+    # Ensure the upload belongs to the current user
+    if upload.user_id != current_user.id:
+        abort(404)
     
-    return render_template('wellbeing/upload.html', title='Upload Screen Time', form=form)
+    return jsonify(upload.to_dict())
+
+@wellbeing.route('/wellbeing/api/screen-time', methods=['POST'])
+def api_screen_time():
+    """Accept a batch of screen time records from a device agent.
+    
+    Authenticate with "Authorization: Bearer <token>". The body is a JSON array
+    of {"date", "app_name", "minutes"} records, an object with a "records"
+    array, or NDJSON with one record per line.
+    """
+    auth = request.headers.get('Authorization', '')
+    user = User.from_api_token(auth[len('Bearer '):] if auth.startswith('Bearer ') else None)
+    if user is None:
+        return jsonify({'error': 'Invalid or missing API token'}), 401
+    
+    if request.mimetype in ('application/x-ndjson', 'application/ndjson'):
+        records = parse_ndjson(request.get_data(as_text=True))
+    else:
+        payload = request.get_json(silent=True)
+        records = payload.get('records') if isinstance(payload, dict) else payload
+    if not isinstance(records, list):
+        return jsonify({'error': 'Expected a JSON array of records, an object with a "records" array, or NDJSON'}), 400
+    
+    max_records = current_app.config['SCREEN_TIME_API_MAX_RECORDS']
+    if len(records) > max_records:
+        return jsonify({'error': f'Batches are limited to {max_records} records'}), 413
+    
+    # One transaction per batch
+    result = import_records(records, user.id)
+    db.session.commit()
+    if result.accepted:
+        invalidate_usage(user.id)
+    
+    status = 422 if result.errors and not result.accepted else 200
+    return jsonify({
+        'accepted': result.accepted,
+        'rejected': len(result.errors),
+        'errors': result.errors
+    }), status
 
 @wellbeing.route('/wellbeing/detox', methods=['GET', 'POST'])
 @login_required
@@ -223,21 +349,9 @@ def digital_detox():
         form.break_interval_minutes.data = active_plan.break_interval_minutes
     
     # Get current screen time data
-    screen_time_logs = ScreenTimeLog.query.filter_by(user_id=current_user.id).order_by(ScreenTimeLog.date.desc()).all()
-    
-    # Calculate total screen time
-    total_screen_time = sum(log.usage_minutes for log in screen_time_logs)
-    
-    # Get app usage by app
-    app_usage = {}
-    for log in screen_time_logs:
-        if log.app_name in app_usage:
-            app_usage[log.app_name] += log.usage_minutes
-        else:
-            app_usage[log.app_name] = log.usage_minutes
-    
-    # Sort apps by usage
-    top_apps = sorted(app_usage.items(), key=lambda x: x[1], reverse=True)
+    usage = usage_summary(current_user.id)
+    total_screen_time = usage.total_minutes
+    top_apps = usage.app_totals
     
     # Generate detox suggestions
     detox_suggestions = []
@@ -253,6 +367,8 @@ def digital_detox():
             active_plan.enable_notifications = form.enable_notifications.data
             active_plan.enable_break_reminders = form.enable_break_reminders.data
             active_plan.break_interval_minutes = form.break_interval_minutes.data
+            active_plan.rebuild_progress()
+            User.bump_data_version(current_user.id)
             db.session.commit()
             flash('Your Digital Detox plan has been updated!', 'success')
         else:
@@ -266,6 +382,9 @@ def digital_detox():
                 user_id=current_user.id
             )
             db.session.add(new_plan)
+            db.session.flush()
+            new_plan.rebuild_progress()
+            User.bump_data_version(current_user.id)
             db.session.commit()
             flash('Your Digital Detox plan has been created!', 'success')
         
@@ -295,6 +414,8 @@ def deactivate_detox_plan(plan_id):
     
     detox_plan.is_active = False
     detox_plan.end_date = datetime.now().date()
+    detox_plan.rebuild_progress()
+    User.bump_data_version(current_user.id)
     db.session.commit()
     
     flash('Your Digital Detox plan has been deactivated', 'success')
@@ -317,22 +438,8 @@ def start_detox_challenge():
         flash('You need an active detox plan with app blocking enabled to start the challenge', 'warning')
         return redirect(url_for('wellbeing.digital_detox'))
     
-    # Get screen time data for personalized challenge suggestions
-    screen_time_logs = ScreenTimeLog.query.filter_by(user_id=current_user.id).order_by(ScreenTimeLog.date.desc()).all()
-    
-    # Calculate total screen time
-    total_screen_time = sum(log.usage_minutes for log in screen_time_logs)
-    
-    # Get app usage by app
-    app_usage = {}
-    for log in screen_time_logs:
-        if log.app_name in app_usage:
-            app_usage[log.app_name] += log.usage_minutes
-        else:
-            app_usage[log.app_name] = log.usage_minutes
-    
-    # Sort apps by usage
-    top_apps = sorted(app_usage.items(), key=lambda x: x[1], reverse=True)[:5]  # Top 5 apps
+    # Last week's heaviest apps for personalized challenge suggestions
+    top_apps = usage_summary(current_user.id, since=datetime.now().date() - timedelta(days=7)).app_totals[:5]
     
     # Set challenge end time (24 hours from now)
     challenge_start = datetime.now()
@@ -344,17 +451,16 @@ def start_detox_challenge():
         active_plan=active_plan,
         top_apps=top_apps,
         challenge_start=challenge_start,
-        challenge_end=challenge_end,
-        total_screen_time=total_screen_time
+        challenge_end=challenge_end
     )
 
 @wellbeing.route('/wellbeing/history')
 @login_required
 def screen_time_history():
     # Get all screen time uploads
-    uploads = ScreenTimeLog.query.filter_by(user_id=current_user.id).with_entities(
-        ScreenTimeLog.upload_file, ScreenTimeLog.uploaded_at
-    ).distinct().order_by(ScreenTimeLog.uploaded_at.desc()).all()
+    uploads = ScreenTimeUpload.query.filter_by(user_id=current_user.id).order_by(
+        ScreenTimeUpload.created_at.desc()
+    ).all()
     
     return render_template(
         'wellbeing/history.html',
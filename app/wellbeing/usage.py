@@ -0,0 +1,40 @@
+from collections import namedtuple
+from app import db, usage_cache
+from app.models import ScreenTimeLog
+
+# app_totals is ((app_name, minutes), ...) heaviest first; daily_totals is
+# ((date, minutes), ...) oldest first; daily_average is minutes per tracked day
+UsageSummary = namedtuple('UsageSummary', ['app_totals', 'daily_totals', 'total_minutes', 'days', 'daily_average'])
+
+
+def _summarize(user_id, since=None):
+    """Aggregate a user's ScreenTimeLog rows per app and per day with GROUP BY queries"""
+    by_app = db.session.query(
+        ScreenTimeLog.app_name, db.func.sum(ScreenTimeLog.usage_minutes)
+    ).filter(ScreenTimeLog.user_id == user_id).group_by(ScreenTimeLog.app_name)
+    by_day = db.session.query(
+        ScreenTimeLog.date, db.func.sum(ScreenTimeLog.usage_minutes)
+    ).filter(ScreenTimeLog.user_id == user_id).group_by(ScreenTimeLog.date).order_by(ScreenTimeLog.date)
+    if since is not None:
+        by_app = by_app.filter(ScreenTimeLog.date >= since)
+        by_day = by_day.filter(ScreenTimeLog.date >= since)
+
+    app_totals = tuple(sorted(((name, int(minutes)) for name, minutes in by_app), key=lambda x: x[1], reverse=True))
+    daily_totals = tuple((day, int(minutes)) for day, minutes in by_day)
+    total_minutes = sum(minutes for _, minutes in daily_totals)
+    days = len(daily_totals)
+    return UsageSummary(app_totals, daily_totals, total_minutes, days, total_minutes / days if days else 0)
+
+
+def usage_summary(user_id, since=None):
+    """Per-app and per-day screen time totals for a user, from since onwards.
+
+    Results are cached per (user, since) until invalidate_usage is called for
+    the user or the cache TTL runs out.
+    """
+    return usage_cache.get_or_compute((user_id, since), lambda: _summarize(user_id, since))
+
+
+def invalidate_usage(user_id):
+    """Forget every cached summary for a user; call after their logs change and commit"""
+    return usage_cache.discard(lambda key: key[0] == user_id)
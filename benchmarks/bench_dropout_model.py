@@ -0,0 +1,127 @@
+"""Train, evaluate and time the habit dropout model on synthetic histories.
+
+Builds a SQLite database where each habit is kept up at its own rate and may
+be abandoned partway through, with screen time that rises as habits slip.
+Reports holdout log loss, AUC and accuracy next to the old fixed 30%
+completion-rate rule, then the time to build features and score every habit.
+
+    python benchmarks/bench_dropout_model.py --users 500 --days 240
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def build_database(users, days, habits_per_user, seed):
+    """Fill a fresh database with habits, logs and daily rollup rows; returns the app"""
+    os.environ['DATABASE_URI'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_dropout.db')
+    from app import create_app, db
+    from app.models import User, Habit, HabitLog, UserDailyStats
+
+    rng = np.random.default_rng(seed)
+    app = create_app()
+    today = date.today()
+    first = today - timedelta(days=days - 1)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(db.insert(User), [
+            {'username': f'user{u}', 'email': f'user{u}@example.com'} for u in range(users)
+        ])
+        user_ids = [row[0] for row in db.session.query(User.id).order_by(User.id)]
+
+        habits = []
+        for user_id in user_ids:
+            for h in range(habits_per_user):
+                created = first + timedelta(days=int(rng.integers(0, days // 2)))
+                habits.append({'name': f'Habit {h}', 'frequency': 'daily', 'user_id': user_id,
+                               'created_at': datetime.combine(created, datetime.min.time())})
+        db.session.execute(db.insert(Habit), habits)
+        rows = db.session.query(Habit.id, Habit.user_id, Habit.created_at).all()
+
+        logs, slipping = [], {}
+        for habit_id, user_id, created_at in rows:
+            start = (created_at.date() - first).days
+            rate = rng.uniform(0.3, 0.95)
+            # About half the habits are abandoned some time after they start
+            quit_day = start + int(rng.integers(10, days)) if rng.random() < 0.5 else days
+            for d in range(start, days):
+                p = rate if d < quit_day else rate * 0.05
+                # Motivation fades in the fortnight before quitting
+                if quit_day - 14 <= d < quit_day:
+                    p *= 0.5
+                if rng.random() < 0.9:
+                    logs.append({'habit_id': habit_id, 'user_id': user_id,
+                                 'date': first + timedelta(days=d), 'completed': bool(rng.random() < p)})
+                if d >= quit_day - 14:
+                    slipping[user_id, d] = slipping.get((user_id, d), 0) + 1
+        for i in range(0, len(logs), 20000):
+            db.session.execute(db.insert(HabitLog), logs[i:i + 20000])
+
+        stats = []
+        for user_id in user_ids:
+            base = rng.uniform(60, 300)
+            for d in range(days):
+                minutes = int(max(0, rng.normal(base + 40 * slipping.get((user_id, d), 0), 30)))
+                stats.append({'user_id': user_id, 'date': first + timedelta(days=d), 'habits_logged': 0,
+                              'habits_completed': 0, 'screen_minutes': minutes, 'top_app': 'App',
+                              'top_app_minutes': minutes})
+        for i in range(0, len(stats), 20000):
+            db.session.execute(db.insert(UserDailyStats), stats[i:i + 20000])
+        db.session.commit()
+        print(f"{users} users, {len(rows)} habits, {len(logs)} habit logs over {days} days")
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--days', type=int, default=240)
+    parser.add_argument('--habits-per-user', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    app = build_database(args.users, args.days, args.habits_per_user, args.seed)
+    from app.habits.dropout import FEATURES, LOOKBACK_DAYS, HORIZON_DAYS, train, score_habits, History, predict
+
+    with app.app_context():
+        start = time.perf_counter()
+        model = train(days=args.days - LOOKBACK_DAYS - HORIZON_DAYS)
+        train_seconds = time.perf_counter() - start
+
+        print(f"\ntrained in {train_seconds:.2f}s; holdout metrics:")
+        metrics = model.metrics
+        print(f"{'':<10} {'AUC':>8} {'accuracy':>10}")
+        print(f"{'model':<10} {metrics['auc']:>8.3f} {metrics['accuracy']:>10.3f}")
+        print(f"{'30% rule':<10} {metrics['rule_auc']:>8.3f} {metrics['rule_accuracy']:>10.3f}")
+        print(f"log loss {metrics['log_loss']:.4f} on {metrics['rows']} rows "
+              f"({metrics['dropout_rate']:.1%} dropped)")
+        print("\nweights: " + ", ".join(
+            f"{name} {weight:+.2f}" for name, weight in zip(('intercept',) + FEATURES, model.weights)
+        ))
+
+        today = date.today()
+        start = time.perf_counter()
+        history = History(today - timedelta(days=LOOKBACK_DAYS - 1), today)
+        features = history.features(today)
+        build_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        predict(model, features)
+        predict_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        scored = score_habits(model)
+        store_seconds = time.perf_counter() - start
+
+        print(f"\nscoring {len(features)} habits: features {build_seconds * 1000:.1f} ms, "
+              f"matrix product {predict_seconds * 1000:.2f} ms, "
+              f"full nightly job incl. writes {store_seconds * 1000:.1f} ms ({scored} scored)")
+
+
+if __name__ == '__main__':
+    main()
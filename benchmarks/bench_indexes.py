@@ -0,0 +1,174 @@
+"""Benchmark the hot HabitLog / ScreenTimeLog queries with and without indexes.
+
+Builds a synthetic SQLite database, then prints EXPLAIN QUERY PLAN output and
+median latency for each query before and after creating the model indexes.
+Tables whose unique constraints give them an SQLite autoindex are swapped for
+unconstrained copies in the BEFORE run, so it really scans.
+
+    python benchmarks/bench_indexes.py --users 2000 --days 365
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+APPS = ['Instagram', 'YouTube', 'Twitter', 'TikTok', 'Productivity App', 'Mail', 'Maps', 'News']
+
+# (label, sql) for the access paths the routes use most
+QUERIES = [
+    ('habit logs for a user in the last 7 days',
+     "SELECT date, completed FROM habit_log WHERE user_id = :user_id AND date >= :week_ago"),
+    ('habit logs for a habit in the last 30 days',
+     "SELECT date, completed FROM habit_log WHERE habit_id = :habit_id AND date >= :month_ago ORDER BY date DESC"),
+    ('screen time per app for a user in the last 7 days',
+     "SELECT app_name, SUM(usage_minutes) FROM screen_time_log "
+     "WHERE user_id = :user_id AND date >= :week_ago GROUP BY app_name"),
+    ('achievement count for a user',
+     "SELECT COUNT(id) FROM user_achievement WHERE user_id = :user_id"),
+    ('digital twin for a habit',
+     "SELECT * FROM digital_twin WHERE habit_id = :habit_id AND user_id = :user_id"),
+]
+
+INDEXED_TABLES = ['habit_log', 'screen_time_log', 'user_achievement', 'digital_twin']
+
+
+def build_database(path, users, days, habits_per_user):
+    """Create the schema from the models and fill it with synthetic rows"""
+    os.environ['DATABASE_URI'] = 'sqlite:///' + path
+    from app import create_app, db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        tables = {name: db.metadata.tables[name] for name in INDEXED_TABLES}
+        indexes = [index for table in tables.values() for index in table.indexes]
+
+    today = date.today()
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO user (id, username, email) VALUES (?, ?, ?)",
+        ((u, f'user{u}', f'user{u}@example.com') for u in range(1, users + 1))
+    )
+    habit_rows = [
+        (u * habits_per_user + h, f'Habit {h}', 'daily', u)
+        for u in range(1, users + 1) for h in range(habits_per_user)
+    ]
+    conn.executemany("INSERT INTO habit (id, name, frequency, user_id) VALUES (?, ?, ?, ?)", habit_rows)
+    conn.executemany(
+        "INSERT INTO digital_twin (user_id, habit_id, completion_rate, streak) VALUES (?, ?, 0.7, 0)",
+        ((user_id, habit_id) for habit_id, _, _, user_id in habit_rows)
+    )
+    conn.executemany(
+        "INSERT INTO habit_log (date, completed, habit_id, user_id) VALUES (?, ?, ?, ?)",
+        (
+            ((today - timedelta(days=d)).isoformat(), random.random() < 0.7, habit_id, user_id)
+            for habit_id, _, _, user_id in habit_rows for d in range(days)
+        )
+    )
+    conn.executemany(
+        "INSERT INTO screen_time_log (date, app_name, usage_minutes, user_id) VALUES (?, ?, ?, ?)",
+        (
+            ((today - timedelta(days=d)).isoformat(), app_name, random.randint(5, 120), u)
+            for u in range(1, users + 1) for d in range(days) for app_name in random.sample(APPS, 4)
+        )
+    )
+    conn.executemany(
+        "INSERT INTO user_achievement (user_id, achievement_id) VALUES (?, ?)",
+        ((u, a) for u in range(1, users + 1) for a in range(1, 4))
+    )
+    conn.commit()
+    return conn, indexes
+
+
+def unique_key_tables(conn):
+    """Tables with an automatic index backing a UNIQUE constraint"""
+    placeholders = ', '.join('?' for _ in INDEXED_TABLES)
+    return sorted({row[0] for row in conn.execute(
+        f"SELECT tbl_name FROM sqlite_master WHERE type = 'index' AND sql IS NULL AND tbl_name IN ({placeholders})",
+        INDEXED_TABLES
+    )})
+
+
+def drop_unique_keys(conn, tables):
+    """Set each table aside and replace it with a copy that has no constraints or indexes"""
+    for table in tables:
+        conn.execute(f"ALTER TABLE {table} RENAME TO {table}_keyed")
+        conn.execute(f"CREATE TABLE {table} AS SELECT * FROM {table}_keyed")
+
+
+def restore_unique_keys(conn, tables):
+    for table in tables:
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {table}_keyed RENAME TO {table}")
+
+
+def run_queries(conn, users, habits_per_user, repeat):
+    today = date.today()
+    for label, sql in QUERIES:
+        print(f"\n  {label}")
+        for row in conn.execute("EXPLAIN QUERY PLAN " + sql, _params(users, habits_per_user, today)):
+            print(f"    plan: {row[-1]}")
+
+        timings = []
+        for _ in range(repeat):
+            params = _params(users, habits_per_user, today)
+            start = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        print(f"    median: {timings[len(timings) // 2] * 1000:.3f} ms over {repeat} runs")
+
+
+def _params(users, habits_per_user, today):
+    user_id = random.randint(1, users)
+    return {
+        'user_id': user_id,
+        'habit_id': user_id * habits_per_user + random.randrange(habits_per_user),
+        'week_ago': (today - timedelta(days=7)).isoformat(),
+        'month_ago': (today - timedelta(days=30)).isoformat(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--habits-per-user', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    random.seed(42)
+    path = os.path.join(tempfile.mkdtemp(), 'bench_indexes.db')
+    print(f"Building synthetic database at {path} ...")
+    start = time.perf_counter()
+    conn, indexes = build_database(path, args.users, args.days, args.habits_per_user)
+    habit_logs = conn.execute("SELECT COUNT(*) FROM habit_log").fetchone()[0]
+    screen_logs = conn.execute("SELECT COUNT(*) FROM screen_time_log").fetchone()[0]
+    print(f"  {habit_logs} habit logs, {screen_logs} screen time logs in {time.perf_counter() - start:.1f}s")
+
+    for index in indexes:
+        conn.execute(f"DROP INDEX IF EXISTS {index.name}")
+    keyed = unique_key_tables(conn)
+    drop_unique_keys(conn, keyed)
+    conn.execute("ANALYZE")
+    print(f"\nBEFORE (no indexes; unique keys dropped from {', '.join(keyed) or 'no tables'})")
+    run_queries(conn, args.users, args.habits_per_user, args.repeat)
+
+    restore_unique_keys(conn, keyed)
+    for index in indexes:
+        columns = ', '.join(column.name for column in index.columns)
+        conn.execute(f"CREATE INDEX {index.name} ON {index.table.name} ({columns})")
+    conn.execute("ANALYZE")
+    print("\nAFTER (composite indexes and unique keys)")
+    run_queries(conn, args.users, args.habits_per_user, args.repeat)
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
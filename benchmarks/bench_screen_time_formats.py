@@ -0,0 +1,95 @@
+"""Compare screen time import throughput for Excel, CSV and Parquet uploads.
+
+Writes the same synthetic export in each format, then reports rows per second
+for parsing and validation alone and for the full import into a fresh SQLite
+database.
+
+    python benchmarks/bench_screen_time_formats.py --rows 100000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+APPS = ['Instagram', 'YouTube', 'Twitter', 'TikTok', 'Productivity App', 'Mail', 'Maps', 'News']
+
+WRITERS = {
+    'xlsx': lambda df, path: df.to_excel(path, index=False),
+    'csv': lambda df, path: df.to_csv(path, index=False),
+    'parquet': lambda df, path: df.to_parquet(path, index=False),
+}
+
+
+def make_frame(rows):
+    """Build an export with one row per app per day, like the device exporters"""
+    today = date.today()
+    return pd.DataFrame({
+        'Date': [(today - timedelta(days=i // len(APPS))).isoformat() for i in range(rows)],
+        'App Name': [APPS[i % len(APPS)] for i in range(rows)],
+        'Usage (Minutes)': [random.randint(1, 180) for _ in range(rows)],
+    })
+
+
+def parse_only(path, chunk_size):
+    from app.wellbeing.ingest import iter_screen_time_chunks, check_rows
+
+    return sum(len(check_rows(chunk).valid) for chunk in iter_screen_time_chunks(path, chunk_size=chunk_size))
+
+
+def full_import(path, chunk_size):
+    from app import create_app, db
+    from app.models import User
+    from app.wellbeing.ingest import import_screen_time_file
+
+    os.environ['DATABASE_URI'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_formats.db')
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com')
+        db.session.add(user)
+        db.session.commit()
+
+        stats = import_screen_time_file(path, user.id, chunk_size=chunk_size)
+        db.session.commit()
+        db.session.remove()
+    return stats.rows
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    rows = func(*args)
+    return rows, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    random.seed(42)
+    df = make_frame(args.rows)
+    directory = tempfile.mkdtemp()
+
+    print(f"{'format':<10} {'size':>10} {'parse rows/s':>14} {'import rows/s':>14}")
+    for name, write in WRITERS.items():
+        path = os.path.join(directory, f'export.{name}')
+        write(df, path)
+
+        rows, parse_seconds = timed(parse_only, path, args.chunk_size)
+        imported, import_seconds = timed(full_import, path, args.chunk_size)
+        assert rows == imported == len(df)
+
+        size_kb = os.path.getsize(path) / 1024
+        print(f"{name:<10} {size_kb:>8.0f}kB {rows / parse_seconds:>14.0f} {rows / import_seconds:>14.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Compare the per-row ORM loop with the chunked screen time upsert path.
+
+Each strategy imports the same synthetic, already-validated DataFrame into a
+fresh SQLite database and reports rows per second.
+
+    python benchmarks/bench_screen_time_ingest.py --rows 50000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+APPS = ['Instagram', 'YouTube', 'Twitter', 'TikTok', 'Productivity App', 'Mail', 'Maps', 'News']
+
+
+def make_frame(rows):
+    """Build a DataFrame shaped like a validated upload chunk"""
+    today = date.today()
+    return pd.DataFrame({
+        'Date': [today - timedelta(days=i // len(APPS)) for i in range(rows)],
+        'App Name': [APPS[i % len(APPS)] for i in range(rows)],
+        'Usage (Minutes)': [random.randint(1, 180) for _ in range(rows)],
+    })
+
+
+def legacy_loop(df, user_id):
+    """The original upload loop: one ORM object per row, then a single commit"""
+    from app import db
+    from app.models import ScreenTimeLog, UserDailyStats
+
+    for _, row in df.iterrows():
+        db.session.add(ScreenTimeLog(
+            date=row['Date'],
+            app_name=row['App Name'],
+            usage_minutes=row['Usage (Minutes)'],
+            user_id=user_id
+        ))
+    UserDailyStats.refresh_screen_time(user_id, df['Date'].unique())
+    db.session.commit()
+
+
+def bulk_path(df, user_id, batch_size):
+    """The chunk writer uploads, API batches and backfills use, then a single commit"""
+    from app import db
+    from app.wellbeing.ingest import write_chunk, refresh_derived
+
+    dates = set()
+    for offset in range(0, len(df), batch_size):
+        dates |= write_chunk(df.iloc[offset:offset + batch_size], user_id, batch_size=batch_size)
+    refresh_derived(user_id, dates)
+    db.session.commit()
+
+
+def run(label, func, df):
+    from app import create_app, db
+    from app.models import User
+
+    os.environ['DATABASE_URI'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench_ingest.db')
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com')
+        db.session.add(user)
+        db.session.commit()
+
+        start = time.perf_counter()
+        func(df, user.id)
+        elapsed = time.perf_counter() - start
+        db.session.remove()
+    print(f"{label:<28} {len(df):>8} rows  {elapsed:8.2f}s  {len(df) / elapsed:>10.0f} rows/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    random.seed(42)
+    df = make_frame(args.rows)
+    legacy = run('legacy iterrows + add()', legacy_loop, df)
+    bulk = run(f'bulk executemany ({args.batch_size})', lambda frame, uid: bulk_path(frame, uid, args.batch_size), df)
+    print(f"speedup: {legacy / bulk:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
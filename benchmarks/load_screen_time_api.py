@@ -0,0 +1,119 @@
+"""Load-test the device agent screen time API with batched JSON or NDJSON posts.
+
+By default the app runs in-process against a fresh SQLite database through the
+Flask test client. Pass --url and --token to drive a running server instead.
+
+    python benchmarks/load_screen_time_api.py --batches 50 --batch-size 1000
+    python benchmarks/load_screen_time_api.py --format ndjson
+    python benchmarks/load_screen_time_api.py --url http://localhost:5000 --token <token>
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+APPS = ['Instagram', 'YouTube', 'Twitter', 'TikTok', 'Productivity App', 'Mail', 'Maps', 'News']
+
+ENDPOINT = '/wellbeing/api/screen-time'
+
+CONTENT_TYPES = {'json': 'application/json', 'ndjson': 'application/x-ndjson'}
+
+
+def make_batches(batches, batch_size):
+    """Distinct (date, app) records so every batch writes new rows"""
+    today = date.today()
+    apps = [f'{APPS[i % len(APPS)]} {i // len(APPS)}' for i in range(batch_size)]
+    for b in range(batches):
+        day = (today - timedelta(days=b)).isoformat()
+        yield [{'date': day, 'app_name': app_name, 'minutes': random.randint(1, 180)} for app_name in apps]
+
+
+def encode(records, fmt):
+    if fmt == 'ndjson':
+        return '\n'.join(json.dumps(record) for record in records).encode()
+    return json.dumps(records).encode()
+
+
+def in_process_poster():
+    """Build a test client for a fresh database and a user with a token"""
+    os.environ['DATABASE_URI'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'load_api.db')
+    from app import create_app, db
+    from app.models import User
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User(username='agent', email='agent@example.com')
+        token = user.generate_api_token()
+        db.session.add(user)
+        db.session.commit()
+
+    client = app.test_client()
+
+    def post(body, content_type):
+        response = client.post(ENDPOINT, data=body, content_type=content_type,
+                               headers={'Authorization': f'Bearer {token}'})
+        return response.status_code, response.get_json()
+    return post
+
+
+def http_poster(url, token):
+    def post(body, content_type):
+        request = urllib.request.Request(url.rstrip('/') + ENDPOINT, data=body, method='POST', headers={
+            'Content-Type': content_type,
+            'Authorization': f'Bearer {token}',
+        })
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, json.load(response)
+        except urllib.error.HTTPError as e:
+            return e.code, json.load(e)
+    return post
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--batches', type=int, default=50)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--format', choices=sorted(CONTENT_TYPES), default='json')
+    parser.add_argument('--url', help='Base URL of a running server')
+    parser.add_argument('--token', help='API token for --url (see `flask users issue-token`)')
+    args = parser.parse_args()
+
+    if args.url and not args.token:
+        parser.error('--url needs --token')
+
+    random.seed(42)
+    post = http_poster(args.url, args.token) if args.url else in_process_poster()
+    content_type = CONTENT_TYPES[args.format]
+
+    latencies = []
+    accepted = 0
+    start = time.perf_counter()
+    for records in make_batches(args.batches, args.batch_size):
+        body = encode(records, args.format)
+        sent = time.perf_counter()
+        status, result = post(body, content_type)
+        latencies.append(time.perf_counter() - sent)
+        if status != 200:
+            raise SystemExit(f"Batch failed with {status}: {result}")
+        accepted += result['accepted']
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{args.format}: {args.batches} batches x {args.batch_size} records")
+    print(f"  accepted {accepted} records in {elapsed:.2f}s ({accepted / elapsed:.0f} records/s)")
+    print(f"  batch latency p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+"""Add dropout risk score to habit
+
+Revision ID: 2e7a5c9b3f16
+Revises: 9d2b6e4f1a73
+Create Date: 2026-10-16 23:48:09.331824
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2e7a5c9b3f16'
+down_revision = '9d2b6e4f1a73'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('habit', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('dropout_risk', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('dropout_scored_on', sa.Date(), nullable=True))
+
+    # Populate the scores with `flask habits train-dropout` then `flask habits score-dropout`
+
+
+def downgrade():
+    with op.batch_alter_table('habit', schema=None) as batch_op:
+        batch_op.drop_column('dropout_scored_on')
+        batch_op.drop_column('dropout_risk')
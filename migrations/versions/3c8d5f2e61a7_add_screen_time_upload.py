@@ -0,0 +1,127 @@
+"""Replace screen_time_import_job with screen_time_upload and link log rows to it
+
+Revision ID: 3c8d5f2e61a7
+Revises: e4a19c7d3f58
+Create Date: 2026-10-16 17:08:54.390127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c8d5f2e61a7'
+down_revision = 'e4a19c7d3f58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('screen_time_upload',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('filename', sa.String(length=100), nullable=False),
+    sa.Column('original_filename', sa.String(length=255), nullable=True),
+    sa.Column('content_hash', sa.String(length=64), nullable=True),
+    sa.Column('byte_size', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('row_count', sa.Integer(), nullable=False),
+    sa.Column('first_date', sa.Date(), nullable=True),
+    sa.Column('last_date', sa.Date(), nullable=True),
+    sa.Column('import_seconds', sa.Float(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('screen_time_upload', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_screen_time_upload_content_hash'), ['content_hash'], unique=False)
+        batch_op.create_index('ix_screen_time_upload_user_id_created_at', ['user_id', 'created_at'], unique=False)
+
+    # Carry over queued imports, then files uploaded before imports were queued
+    op.execute(
+        "INSERT INTO screen_time_upload (id, filename, content_hash, status, row_count, error, "
+        "created_at, started_at, finished_at, user_id) "
+        "SELECT id, upload_file, content_hash, status, rows_processed, error, "
+        "created_at, started_at, finished_at, user_id FROM screen_time_import_job"
+    )
+    op.execute(
+        "INSERT INTO screen_time_upload (filename, status, row_count, created_at, finished_at, user_id) "
+        "SELECT upload_file, 'completed', COUNT(id), MIN(uploaded_at), MAX(uploaded_at), user_id "
+        "FROM screen_time_log WHERE upload_file IS NOT NULL AND upload_file NOT IN "
+        "(SELECT filename FROM screen_time_upload) GROUP BY user_id, upload_file"
+    )
+
+    with op.batch_alter_table('screen_time_log', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('upload_id', sa.Integer(), nullable=True))
+
+    op.execute(
+        "UPDATE screen_time_log SET upload_id = (SELECT screen_time_upload.id FROM screen_time_upload "
+        "WHERE screen_time_upload.filename = screen_time_log.upload_file "
+        "AND screen_time_upload.user_id = screen_time_log.user_id)"
+    )
+    op.execute(
+        "UPDATE screen_time_upload SET "
+        "first_date = (SELECT MIN(date) FROM screen_time_log WHERE upload_id = screen_time_upload.id), "
+        "last_date = (SELECT MAX(date) FROM screen_time_log WHERE upload_id = screen_time_upload.id)"
+    )
+
+    with op.batch_alter_table('screen_time_log', schema=None) as batch_op:
+        batch_op.create_foreign_key('fk_screen_time_log_upload_id', 'screen_time_upload', ['upload_id'], ['id'])
+        batch_op.drop_column('uploaded_at')
+        batch_op.drop_column('upload_file')
+
+    with op.batch_alter_table('screen_time_import_job', schema=None) as batch_op:
+        batch_op.drop_index('ix_screen_time_import_job_content_hash')
+        batch_op.drop_index('ix_screen_time_import_job_user_id')
+
+    op.drop_table('screen_time_import_job')
+
+
+def downgrade():
+    op.create_table('screen_time_import_job',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('upload_file', sa.String(length=100), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('rows_processed', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('screen_time_import_job', schema=None) as batch_op:
+        batch_op.create_index('ix_screen_time_import_job_user_id', ['user_id'], unique=False)
+        batch_op.create_index('ix_screen_time_import_job_content_hash', ['content_hash'], unique=False)
+
+    op.execute(
+        "INSERT INTO screen_time_import_job (id, upload_file, status, rows_processed, error, "
+        "created_at, started_at, finished_at, user_id, content_hash) "
+        "SELECT id, filename, status, row_count, error, "
+        "created_at, started_at, finished_at, user_id, content_hash FROM screen_time_upload"
+    )
+
+    with op.batch_alter_table('screen_time_log', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('upload_file', sa.VARCHAR(length=100), nullable=True))
+        batch_op.add_column(sa.Column('uploaded_at', sa.DATETIME(), nullable=True))
+
+    op.execute(
+        "UPDATE screen_time_log SET "
+        "upload_file = (SELECT filename FROM screen_time_upload WHERE screen_time_upload.id = screen_time_log.upload_id), "
+        "uploaded_at = (SELECT created_at FROM screen_time_upload WHERE screen_time_upload.id = screen_time_log.upload_id)"
+    )
+
+    with op.batch_alter_table('screen_time_log', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_screen_time_log_upload_id', type_='foreignkey')
+        batch_op.drop_column('upload_id')
+
+    with op.batch_alter_table('screen_time_upload', schema=None) as batch_op:
+        batch_op.drop_index('ix_screen_time_upload_user_id_created_at')
+        batch_op.drop_index(batch_op.f('ix_screen_time_upload_content_hash'))
+
+    op.drop_table('screen_time_upload')
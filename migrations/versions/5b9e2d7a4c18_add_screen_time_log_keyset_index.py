@@ -0,0 +1,26 @@
+"""Add keyset pagination index to screen_time_log
+
+Revision ID: 5b9e2d7a4c18
+Revises: 7e3b91c5d2a4
+Create Date: 2026-10-16 20:04:11.582930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b9e2d7a4c18'
+down_revision = '7e3b91c5d2a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('screen_time_log', schema=None) as batch_op:
+        batch_op.create_index('ix_screen_time_log_user_id_date_id', ['user_id', 'date', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('screen_time_log', schema=None) as batch_op:
+        batch_op.drop_index('ix_screen_time_log_user_id_date_id')
@@ -0,0 +1,38 @@
+"""Add user_daily_stats rollup table
+
+Revision ID: 5d2e7c41b9a3
+Revises: 8f138325f499
+Create Date: 2026-10-16 11:20:05.774310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2e7c41b9a3'
+down_revision = '8f138325f499'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_daily_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('habits_logged', sa.Integer(), nullable=False),
+    sa.Column('habits_completed', sa.Integer(), nullable=False),
+    sa.Column('screen_minutes', sa.Integer(), nullable=False),
+    sa.Column('top_app', sa.String(length=100), nullable=True),
+    sa.Column('top_app_minutes', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'date', name='uq_user_daily_stats_user_id_date')
+    )
+
+    # Populate the new table with `flask stats backfill`
+
+
+def downgrade():
+    op.drop_table('user_daily_stats')
@@ -0,0 +1,27 @@
+"""Drop the covering (user_id, date) index from screen_time_log
+
+Revision ID: 6a1d3e8b5f27
+Revises: b4f8e1a7c290
+Create Date: 2026-10-17 09:12:40.318562
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a1d3e8b5f27'
+down_revision = 'b4f8e1a7c290'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The (user_id, date, app_name) unique key already serves the date window queries
+    with op.batch_alter_table('screen_time_log', schema=None) as batch_op:
+        batch_op.drop_index('ix_screen_time_log_user_id_date')
+
+
+def downgrade():
+    with op.batch_alter_table('screen_time_log', schema=None) as batch_op:
+        batch_op.create_index('ix_screen_time_log_user_id_date', ['user_id', 'date', 'app_name', 'usage_minutes'], unique=False)
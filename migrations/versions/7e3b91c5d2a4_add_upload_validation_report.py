@@ -0,0 +1,28 @@
+"""Add validation report columns to screen_time_upload
+
+Revision ID: 7e3b91c5d2a4
+Revises: a2f6b8d04e13
+Create Date: 2026-10-16 19:12:48.307615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e3b91c5d2a4'
+down_revision = 'a2f6b8d04e13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('screen_time_upload', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rejected_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('error_report', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('screen_time_upload', schema=None) as batch_op:
+        batch_op.drop_column('error_report')
+        batch_op.drop_column('rejected_count')
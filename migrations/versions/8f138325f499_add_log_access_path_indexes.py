@@ -0,0 +1,46 @@
+"""Add composite indexes for habit log and screen time access paths
+
+Revision ID: 8f138325f499
+Revises: 9caf619fa036
+Create Date: 2026-10-16 10:03:27.560912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f138325f499'
+down_revision = '9caf619fa036'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('habit_log', schema=None) as batch_op:
+        batch_op.create_index('ix_habit_log_user_id_date', ['user_id', 'date', 'completed'], unique=False)
+        batch_op.create_index('ix_habit_log_habit_id_date', ['habit_id', 'date', 'completed'], unique=False)
+
+    with op.batch_alter_table('screen_time_log', schema=None) as batch_op:
+        batch_op.create_index('ix_screen_time_log_user_id_date', ['user_id', 'date', 'app_name', 'usage_minutes'], unique=False)
+
+    with op.batch_alter_table('user_achievement', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_user_achievement_user_id'), ['user_id'], unique=False)
+
+    with op.batch_alter_table('digital_twin', schema=None) as batch_op:
+        batch_op.create_index('ix_digital_twin_habit_id_user_id', ['habit_id', 'user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('digital_twin', schema=None) as batch_op:
+        batch_op.drop_index('ix_digital_twin_habit_id_user_id')
+
+    with op.batch_alter_table('user_achievement', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_user_achievement_user_id'))
+
+    with op.batch_alter_table('screen_time_log', schema=None) as batch_op:
+        batch_op.drop_index('ix_screen_time_log_user_id_date')
+
+    with op.batch_alter_table('habit_log', schema=None) as batch_op:
+        batch_op.drop_index('ix_habit_log_habit_id_date')
+        batch_op.drop_index('ix_habit_log_user_id_date')
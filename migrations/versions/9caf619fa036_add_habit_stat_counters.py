@@ -0,0 +1,36 @@
+"""Add stored streak and completion counters to habit
+
+Revision ID: 9caf619fa036
+Revises: 039f7fa09661
+Create Date: 2026-10-16 09:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9caf619fa036'
+down_revision = '039f7fa09661'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('habit', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('current_streak_days', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('longest_streak_days', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('last_completed_date', sa.Date(), nullable=True))
+        batch_op.add_column(sa.Column('total_logs', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('completed_logs', sa.Integer(), server_default='0', nullable=False))
+
+    # Existing habits start at zero; populate them with `flask habits rebuild-stats`
+
+
+def downgrade():
+    with op.batch_alter_table('habit', schema=None) as batch_op:
+        batch_op.drop_column('completed_logs')
+        batch_op.drop_column('total_logs')
+        batch_op.drop_column('last_completed_date')
+        batch_op.drop_column('longest_streak_days')
+        batch_op.drop_column('current_streak_days')
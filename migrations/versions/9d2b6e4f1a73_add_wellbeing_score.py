@@ -0,0 +1,37 @@
+"""Add wellbeing_score table
+
+Revision ID: 9d2b6e4f1a73
+Revises: f81c4d6e9a35
+Create Date: 2026-10-16 23:05:41.527690
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d2b6e4f1a73'
+down_revision = 'f81c4d6e9a35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('wellbeing_score',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('score', sa.Integer(), nullable=False),
+    sa.Column('habit_score', sa.Integer(), nullable=False),
+    sa.Column('screen_score', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'date', name='uq_wellbeing_score_user_id_date')
+    )
+
+    # Populate history with `flask stats snapshot-scores --days N`
+
+
+def downgrade():
+    op.drop_table('wellbeing_score')
@@ -0,0 +1,28 @@
+"""Add api_token_hash to user
+
+Revision ID: a2f6b8d04e13
+Revises: 3c8d5f2e61a7
+Create Date: 2026-10-16 18:21:37.552904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a2f6b8d04e13'
+down_revision = '3c8d5f2e61a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('api_token_hash', sa.String(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_user_api_token_hash'), ['api_token_hash'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_user_api_token_hash'))
+        batch_op.drop_column('api_token_hash')
@@ -0,0 +1,39 @@
+"""Add screen_time_trend table
+
+Revision ID: b4f8e1a7c290
+Revises: 2e7a5c9b3f16
+Create Date: 2026-10-17 00:21:55.604118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4f8e1a7c290'
+down_revision = '2e7a5c9b3f16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('screen_time_trend',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('window_days', sa.Integer(), nullable=False),
+    sa.Column('through', sa.Date(), nullable=True),
+    sa.Column('n', sa.Integer(), nullable=False),
+    sa.Column('sum_x', sa.Float(), nullable=False),
+    sa.Column('sum_y', sa.Float(), nullable=False),
+    sa.Column('sum_xy', sa.Float(), nullable=False),
+    sa.Column('sum_xx', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'window_days', name='uq_screen_time_trend_user_id_window_days')
+    )
+
+    # Populate the sums with `flask stats backfill`
+
+
+def downgrade():
+    op.drop_table('screen_time_trend')
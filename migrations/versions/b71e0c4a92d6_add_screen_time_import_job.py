@@ -0,0 +1,41 @@
+"""Add screen_time_import_job table
+
+Revision ID: b71e0c4a92d6
+Revises: 5d2e7c41b9a3
+Create Date: 2026-10-16 14:02:41.118205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b71e0c4a92d6'
+down_revision = '5d2e7c41b9a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('screen_time_import_job',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('upload_file', sa.String(length=100), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('rows_processed', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('screen_time_import_job', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_screen_time_import_job_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('screen_time_import_job', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_screen_time_import_job_user_id'))
+
+    op.drop_table('screen_time_import_job')
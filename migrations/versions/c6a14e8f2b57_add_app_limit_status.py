@@ -0,0 +1,43 @@
+"""Add app_limit_status table
+
+Revision ID: c6a14e8f2b57
+Revises: 5b9e2d7a4c18
+Create Date: 2026-10-16 20:41:37.106254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6a14e8f2b57'
+down_revision = '5b9e2d7a4c18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('app_limit_status',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('usage_minutes', sa.Integer(), nullable=False),
+    sa.Column('limit_minutes', sa.Integer(), nullable=False),
+    sa.Column('headroom_minutes', sa.Integer(), nullable=False),
+    sa.Column('app_limit_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['app_limit_id'], ['app_limit.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('app_limit_id', 'date', name='uq_app_limit_status_app_limit_id_date')
+    )
+    with op.batch_alter_table('app_limit_status', schema=None) as batch_op:
+        batch_op.create_index('ix_app_limit_status_user_id_date', ['user_id', 'date'], unique=False)
+
+    # Populate the new table with `flask screen-time check-limits --days N`
+
+
+def downgrade():
+    with op.batch_alter_table('app_limit_status', schema=None) as batch_op:
+        batch_op.drop_index('ix_app_limit_status_user_id_date')
+
+    op.drop_table('app_limit_status')
@@ -0,0 +1,38 @@
+"""Add progress counters to digital_detox_plan
+
+Revision ID: d3f7a92c5e61
+Revises: c6a14e8f2b57
+Create Date: 2026-10-16 21:15:52.440318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3f7a92c5e61'
+down_revision = 'c6a14e8f2b57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('digital_detox_plan', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('days_tracked', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('days_under_limit', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('current_streak', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('best_streak', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('minutes_saved', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('progress_through', sa.Date(), nullable=True))
+
+    # Populate the counters with `flask stats backfill`
+
+
+def downgrade():
+    with op.batch_alter_table('digital_detox_plan', schema=None) as batch_op:
+        batch_op.drop_column('progress_through')
+        batch_op.drop_column('minutes_saved')
+        batch_op.drop_column('best_streak')
+        batch_op.drop_column('current_streak')
+        batch_op.drop_column('days_under_limit')
+        batch_op.drop_column('days_tracked')
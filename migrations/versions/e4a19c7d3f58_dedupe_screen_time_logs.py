@@ -0,0 +1,42 @@
+"""Deduplicate screen_time_log and add upload content hashes
+
+Revision ID: e4a19c7d3f58
+Revises: b71e0c4a92d6
+Create Date: 2026-10-16 15:37:12.604981
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a19c7d3f58'
+down_revision = 'b71e0c4a92d6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('screen_time_import_job', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_screen_time_import_job_content_hash'), ['content_hash'], unique=False)
+
+    # Duplicates come from re-uploading the same export, so keep the newest row per key
+    op.execute(
+        "DELETE FROM screen_time_log WHERE id NOT IN ("
+        "SELECT MAX(id) FROM screen_time_log GROUP BY user_id, date, app_name)"
+    )
+
+    with op.batch_alter_table('screen_time_log', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_screen_time_log_user_id_date_app_name', ['user_id', 'date', 'app_name'])
+
+    # Re-derive the daily rollup afterwards with `flask stats backfill`
+
+
+def downgrade():
+    with op.batch_alter_table('screen_time_log', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_screen_time_log_user_id_date_app_name', type_='unique')
+
+    with op.batch_alter_table('screen_time_import_job', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_screen_time_import_job_content_hash'))
+        batch_op.drop_column('content_hash')
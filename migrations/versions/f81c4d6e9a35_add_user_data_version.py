@@ -0,0 +1,26 @@
+"""Add data_version to user
+
+Revision ID: f81c4d6e9a35
+Revises: d3f7a92c5e61
+Create Date: 2026-10-16 22:40:18.913552
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f81c4d6e9a35'
+down_revision = 'd3f7a92c5e61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('data_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('data_version')
@@ -0,0 +1,14 @@
+import pytest
+
+from app import create_app, db
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """An app bound to a fresh SQLite database, with its context pushed"""
+    monkeypatch.setenv('DATABASE_URI', 'sqlite:///' + str(tmp_path / 'test.db'))
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
@@ -0,0 +1,56 @@
+from datetime import date
+
+import pandas as pd
+
+from app.wellbeing import ingest
+from app.wellbeing.ingest import check_rows
+
+
+def frame(dates):
+    return pd.DataFrame({
+        'Date': dates,
+        'App Name': ['Instagram'] * len(dates),
+        'Usage (Minutes)': [30] * len(dates),
+    }, index=range(2, len(dates) + 2))
+
+
+def test_mixed_utc_offsets_keep_local_dates():
+    check = check_rows(frame([
+        '2024-03-30T10:00:00+01:00',
+        '2024-04-01T10:00:00+02:00',
+        '2024-04-02',
+        'not a date',
+    ]))
+
+    assert check.valid['Date'].tolist() == [date(2024, 3, 30), date(2024, 4, 1), date(2024, 4, 2)]
+    assert check.rejected == 1
+    assert check.errors == [(5, ['invalid date'])]
+
+
+def test_mixed_utc_offsets_with_iso_format():
+    check = check_rows(frame(['2024-03-30T23:30:00+01:00', '2024-03-31T00:30:00+02:00', 'bad']), date_format='ISO8601')
+
+    assert check.valid['Date'].tolist() == [date(2024, 3, 30), date(2024, 3, 31)]
+    assert check.errors == [(4, ['invalid date'])]
+
+
+def test_mixed_utc_offsets_parse_without_per_row_calls(monkeypatch):
+    def per_row(*args, **kwargs):
+        raise AssertionError('dates were parsed row by row')
+
+    series_map = pd.Series.map
+
+    def map_without_callables(self, arg, *args, **kwargs):
+        # pandas itself maps through a lookup Series when caching parsed dates
+        if callable(arg):
+            per_row()
+        return series_map(self, arg, *args, **kwargs)
+
+    monkeypatch.setattr(pd.Series, 'map', map_without_callables)
+    monkeypatch.setattr(pd.Series, 'apply', per_row)
+    monkeypatch.setattr(ingest, '_drop_offsets', per_row)
+
+    check = check_rows(frame(['2024-03-30T23:30:00+01:00', '2024-03-31T00:30:00+02:00', '2024-04-01T08:00:00Z'] * 1000))
+
+    assert check.rejected == 0
+    assert check.valid['Date'].iloc[:3].tolist() == [date(2024, 3, 30), date(2024, 3, 31), date(2024, 4, 1)]
@@ -0,0 +1,24 @@
+from datetime import date
+
+from app import db
+from app.models import User, DigitalDetoxPlan
+
+
+def test_completed_count_counts_inactive_plans_not_streaks(app):
+    user = User(username='alice', email='alice@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+
+    streak = DigitalDetoxPlan.GOAL_STREAK_DAYS
+    db.session.add_all([
+        # Finished plans count whatever their streak
+        DigitalDetoxPlan(user_id=user.id, daily_limit_minutes=120, start_date=date(2024, 1, 1), is_active=False),
+        DigitalDetoxPlan(user_id=user.id, daily_limit_minutes=120, start_date=date(2024, 2, 1), is_active=False,
+                         best_streak=streak),
+        # A running plan does not, even once it has reached the goal streak
+        DigitalDetoxPlan(user_id=user.id, daily_limit_minutes=120, start_date=date(2024, 3, 1), is_active=True,
+                         best_streak=streak),
+    ])
+    db.session.commit()
+
+    assert DigitalDetoxPlan.completed_count(user.id) == 2
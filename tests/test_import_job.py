@@ -0,0 +1,32 @@
+from app import db
+from app.models import User, ScreenTimeLog, ScreenTimeUpload
+from app.wellbeing.ingest import run_import_job
+
+
+def queue_upload(user, path):
+    upload = ScreenTimeUpload(filename=path.name, user_id=user.id)
+    db.session.add(upload)
+    db.session.commit()
+    return upload.id
+
+
+def test_sum_mode_reupload_after_failure_counts_minutes_once(app, tmp_path):
+    app.config['SCREEN_TIME_UPSERT_MODE'] = 'sum'
+    user = User(username='alice', email='alice@example.com', password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+
+    header = 'Date,App Name,Usage (Minutes)\n'
+    rows = '2024-01-01,Instagram,30\n2024-01-02,Instagram,40\n'
+    broken = tmp_path / 'broken.csv'
+    broken.write_text(header + rows + '2024-01-03,"Instagram,50\n')
+    fixed = tmp_path / 'fixed.csv'
+    fixed.write_text(header + rows + '2024-01-03,Instagram,50\n')
+
+    # The first chunk parses before the unterminated quote fails the file
+    assert run_import_job(queue_upload(user, broken), str(broken), chunk_size=2) == ScreenTimeUpload.FAILED
+    assert ScreenTimeLog.query.count() == 0
+
+    assert run_import_job(queue_upload(user, fixed), str(fixed), chunk_size=2) == ScreenTimeUpload.COMPLETED
+    minutes = {log.date.isoformat(): log.usage_minutes for log in ScreenTimeLog.query}
+    assert minutes == {'2024-01-01': 30, '2024-01-02': 40, '2024-01-03': 50}